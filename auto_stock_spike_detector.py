@@ -1,66 +1,96 @@
 
 import streamlit as st
 import pandas as pd
-import yfinance as yf
-import mplfinance as mpf
+
+import ema_state
+import fetch_plan
+import hit_views
+import market_index
+import pipeline
+import screener
+import sweep
+import symbol_master
+from fetch_pool import iter_histories
 
 st.title("📈 台股自動飆股偵測器（純 Yahoo Finance）")
 
 # 讀取所有上市櫃股票代碼
-try:
-    df_map = pd.read_csv("tw_stocks.csv", dtype=str)
-    codes = df_map["股票代碼"].tolist()
-except FileNotFoundError:
-    st.error("找不到 tw_stocks.csv，請將股票代碼對照表放在專案根目錄。")
+names_map = symbol_master.names()
+codes = list(names_map)
+if not codes:
+    st.error("找不到股票主檔，請先執行 python symbol_master.py refresh，或將 tw_stocks.csv 放在專案根目錄。")
     st.stop()
 
+# 下載量依條件需要的指標決定：EMA30 暖機 + 5 日均量，只需判斷最後一根；
+# 但最低天數最大可選到 max(sweep.MIN_DAYS)，歷史至少要有這麼多根，否則所有股票都會被濾掉
+HISTORY_PERIOD = fetch_plan.plan("1d", 1, spans=(6, 30), windows=(5,), min_bars=max(sweep.MIN_DAYS))
+
 # 參數設定
 vol_mult = st.slider("爆量倍率（當日量 > 前5日平均量 × N）", 1.5, 5.0, 2.0, 0.5)
-min_days = st.slider("最低資料天數（至少要有 x 天歷史）", 20, 90, 30, 10)
+min_days = st.slider("最低資料天數（至少要有 x 天歷史）", min(sweep.MIN_DAYS), max(sweep.MIN_DAYS), 30, 10)
+sweep_mode = st.checkbox("參數掃描：同時評估所有爆量倍率 × 最低天數組合")
 
-if st.button("開始自動篩選"):
-    results = []
+
+# 第一段：多執行緒同時下載，進度條依完成數推進
+def fetch_stage():
+    frames = {}
     progress = st.progress(0)
     total = len(codes)
-    for idx, code in enumerate(codes):
-        progress.progress((idx+1)/total)
-        ticker = yf.Ticker(f"{code}.TW")
-        df = ticker.history(period="3mo", interval="1d")
-        if df.empty or len(df) < min_days:
-            continue
+    for done, (symbol, df) in enumerate(iter_histories([market_index.symbol_for(code) for code in codes], HISTORY_PERIOD), 1):
+        progress.progress(done/total)
+        if len(df) >= 2:
+            frames[symbol] = df
+    progress.empty()
+    return frames
 
-        df["EMA6"] = df["Close"].ewm(span=6).mean()
-        df["EMA30"] = df["Close"].ewm(span=30).mean()
-        df["MA5Vol"] = df["Volume"].rolling(5).mean()
 
-        last = df.iloc[-1]
-        prev = df.iloc[-2]
-        golden = prev["EMA6"] < prev["EMA30"] and last["EMA6"] > last["EMA30"]
-        spike = last["Volume"] > vol_mult * last["MA5Vol"] and last["Close"] > prev["Close"]
+# 第二段：EMA6／EMA30 沿用上次存下的狀態，只把新的K棒推進去；每檔只留判斷需要的數值
+def feature_stage(frames):
+    ema = ema_state.load((6, 30), "1d")
+    rows = []
+    columns = ["代碼", "前EMA6", "前EMA30", "EMA6", "EMA30", "前收盤", "收盤", "成交量", "MA5Vol", "天數"]
+    for symbol, df in frames.items():
+        (prev_ema6, prev_ema30), (ema6, ema30) = ema.advance(symbol, df)
+        rows.append({
+            "代碼": symbol.split(".")[0],
+            "前EMA6": prev_ema6, "前EMA30": prev_ema30, "EMA6": ema6, "EMA30": ema30,
+            "前收盤": df["Close"].iloc[-2], "收盤": df["Close"].iloc[-1],
+            "成交量": df["Volume"].iloc[-1], "MA5Vol": df["Volume"].iloc[-5:].mean(),
+            "天數": len(df),
+        })
+    ema.save()
+    return pd.DataFrame(rows, columns=columns).sort_values("代碼", ignore_index=True)
 
-        if golden and spike:
-            results.append({
-                "代碼": code,
-                "名稱": (df_map.loc[df_map["股票代碼"]==code, "公司名稱"].values[0] if code in df_map["股票代碼"].values else ""),
-                "收盤": round(last["Close"],2),
-                "成交量": int(last["Volume"])
-            })
 
-    progress.empty()
-    if not results:
+if st.button("開始自動篩選"):
+    pipeline.new_scan()
+
+scan = pipeline.current_scan()
+if scan is not None:
+    frames = pipeline.stage("fetch", scan, fetch_stage)
+    features = pipeline.stage("features", scan, lambda: feature_stage(frames))
+    by_code = {symbol.split(".")[0]: df for symbol, df in frames.items()}
+
+    # 第三段：只有這段會隨滑桿重跑
+    golden = (features["前EMA6"] < features["前EMA30"]) & (features["EMA6"] > features["EMA30"])
+    spike = (features["成交量"] > vol_mult * features["MA5Vol"]) & (features["收盤"] > features["前收盤"])
+    hits = features[golden & spike & (features["天數"] >= min_days)]
+    if hits.empty:
         st.warning("找不到符合條件的飆股")
     else:
-        df_res = pd.DataFrame(results)
-        st.dataframe(df_res)
+        df_res = pd.DataFrame({
+            "代碼": hits["代碼"],
+            "名稱": [names_map.get(code, "") for code in hits["代碼"]],
+            "收盤": hits["收盤"].round(2),
+            "成交量": hits["成交量"].astype("int64"),
+        }).reset_index(drop=True)
+        # K 線圖直接用篩選時下載的資料，打開哪一檔才畫哪一檔
+        hit_views.show(screener.hits_from(df_res, by_code), names_map)
 
-        # 顯示第一檔飆股的 K 線圖
-        sel = df_res.iloc[0]["代碼"]
-        df2 = yf.Ticker(f"{sel}.TW").history(period="1mo", interval="1d")
-        mc = mpf.make_marketcolors(up='red', down='green')
-        fig, ax = mpf.plot(
-            df2, type='candle', mav=(6,30),
-            volume=True, returnfig=True,
-            style=mpf.make_mpf_style(marketcolors=mc),
-            title=f"{sel} K 線圖"
-        )
-        st.pyplot(fig)
+    if sweep_mode:
+        st.subheader(f"📊 參數掃描（報酬以訊號後 {sweep.HORIZON} 日計）")
+        candidates = pipeline.stage("sweep", scan, lambda: sweep.prepare(by_code))
+        tables = sweep.sweep(candidates, sweep.VOL_MULTS, sweep.MIN_DAYS)
+        for title, table in tables.items():
+            st.markdown(f"**{title}**")
+            st.dataframe(table)
@@ -1,58 +1,102 @@
 import streamlit as st
-import pandas as pd
-import yfinance as yf
-import mplfinance as mpf
+
+import fetch_plan
+import hit_views
+import market_index
+import parallel_screener
+import pipeline
+import screener
+import streaming_screener
+import symbol_master
+import sweep
+from bulk_download import CHUNK_SIZE, iter_chunks
+from ohlcv import OHLCV
 
 st.title("📈 台股自動飆股偵測器（Bulk 下載版）")
 
 # 載入所有股票代碼
-try:
-    df_map = pd.read_csv("tw_stocks.csv", dtype=str)
-    codes = df_map["股票代碼"].tolist()
-    names_map = dict(zip(df_map["股票代碼"], df_map["公司名稱"]))
-except Exception as e:
-    st.error(f"載入 tw_stocks.csv 失敗: {e}")
+names_map = symbol_master.names()
+codes = list(names_map)
+if not codes:
+    st.error("載入股票主檔失敗，請先執行 python symbol_master.py refresh")
     st.stop()
 
+# 下載量依條件需要的指標決定：EMA30 暖機 + 5 日均量，只需判斷最後一根；
+# 但最低天數最大可選到 max(sweep.MIN_DAYS)，歷史至少要有這麼多根，否則所有股票都會被濾掉
+HISTORY_PERIOD = fetch_plan.plan("1d", 1, spans=(6, 30), windows=(5,), min_bars=max(sweep.MIN_DAYS))
+
 # 參數設定
 vol_mult = st.slider("爆量倍率 (Volume > 前5日平均 × N)", 1.5, 5.0, 2.0, 0.5)
-min_days = st.slider("最低歷史天數", 20, 90, 30, 10)
+min_days = st.slider("最低歷史天數", min(sweep.MIN_DAYS), max(sweep.MIN_DAYS), 30, 10)
+chunk_size = st.slider("每批下載檔數", 20, 500, CHUNK_SIZE, 20)
+sweep_mode = st.checkbox("參數掃描：同時評估所有爆量倍率 × 最低天數組合")
+parallel = st.checkbox("多核心計算指標（依股票分片給多個行程）")
+low_memory = st.checkbox("低記憶體模式：逐批計算，只保留每檔的判斷摘要")
+max_rss_mb = st.number_input("記憶體上限 (MB)", 256, 16384, streaming_screener.MAX_RSS_MB, 128,
+                             disabled=not low_memory)
 
-if st.button("開始篩選"):
-    tickers = [f"{code}.TW" for code in codes]
-    # Bulk download
-    data = yf.download(tickers, period="3mo", interval="1d", group_by="ticker", threads=True)
 
-    results = []
+# 第一段：分批下載，失敗的批次會自動重試；每批轉成精簡的 OHLCV 保存，原始 DataFrame 隨即丟掉
+def fetch_stage():
+    tickers = [market_index.symbol_for(code) for code in codes]
+    frames = {}
+    progress = st.progress(0)
+    total = len(tickers)
+    done = 0
+    for chunk, chunk_frames in iter_chunks(tickers, period=HISTORY_PERIOD, interval="1d", chunk_size=chunk_size):
+        done += len(chunk)
+        progress.progress(done/total)
+        frames.update({ticker.split(".")[0]: OHLCV.from_frame(df) for ticker, df in chunk_frames.items()})
+    progress.empty()
+    return frames
+
+
+# 低記憶體模式：下載與指標合成一段，每批算完只留摘要、候選股的最後幾根K棒與掃描用的候選
+def stream_stage():
+    tickers = [market_index.symbol_for(code) for code in codes]
     progress = st.progress(0)
-    total = len(codes)
-    for idx, code in enumerate(codes):
-        progress.progress((idx+1)/total)
-        try:
-            df = data[code + ".TW"].dropna()
-        except KeyError:
-            continue
-        if len(df) < min_days:
-            continue
-        df["EMA6"] = df["Close"].ewm(span=6).mean()
-        df["EMA30"] = df["Close"].ewm(span=30).mean()
-        df["MA5Vol"] = df["Volume"].rolling(5).mean()
-        last = df.iloc[-1]
-        prev = df.iloc[-2]
-        golden = (prev["EMA6"] < prev["EMA30"]) and (last["EMA6"] > last["EMA30"])
-        spike  = (last["Volume"] > vol_mult * last["MA5Vol"]) and (last["Close"] > prev["Close"])
-        if golden and spike:
-            results.append({"代碼": code, "名稱": names_map.get(code, ""), "收盤": round(last["Close"],2), "成交量": int(last["Volume"])})
+    sweep_parts = []
+    summary, charts = streaming_screener.stream(
+        tickers, period=HISTORY_PERIOD, interval="1d", chunk_size=chunk_size, max_rss_mb=max_rss_mb,
+        progress=lambda done, total: progress.progress(done/total),
+        on_chunk=lambda frames: sweep_parts.append(sweep.prepare(frames)))
     progress.empty()
-    if not results:
+    return summary, charts, sweep.merge(sweep_parts)
+
+
+# 第二段：整個市場一次算好 EMA6、EMA30 與 5 日均量
+def feature_stage(frames):
+    panel = screener.build_panel(frames)
+    if parallel:
+        return panel, parallel_screener.compute_features(panel)
+    return panel, screener.compute_features(panel)
+
+
+if st.button("開始篩選"):
+    pipeline.new_scan()
+
+scan = pipeline.current_scan()
+if scan is not None:
+    # 第三段：只有判斷這段會隨滑桿重跑
+    if low_memory:
+        summary, frames, candidates = pipeline.stage("stream", scan, stream_stage)
+        df_res = streaming_screener.hit_table(summary, streaming_screener.verdict(summary, vol_mult, min_days))
+    else:
+        frames = pipeline.stage("fetch", scan, fetch_stage)
+        panel, features = pipeline.stage("features", scan, lambda: feature_stage(frames))
+        df_res = screener.hit_table(panel, screener.screen(panel, features, vol_mult, min_days))
+    df_res = df_res.sort_values("代碼", ignore_index=True)
+    if df_res.empty:
         st.warning("找不到符合條件的飆股")
     else:
-        df_res = pd.DataFrame(results)
-        st.dataframe(df_res)
-        sel = df_res.iloc[0]["代碼"]
-        df2 = data[sel + ".TW"].dropna().tail(30)
-        mc = mpf.make_marketcolors(up='red', down='green')
-        fig, ax = mpf.plot(df2, type='candle', mav=(6,30), volume=True, returnfig=True,
-                           style=mpf.make_mpf_style(marketcolors=mc),
-                           title=f"{sel} ({names_map.get(sel)}) 最近 1 個月 K 線")
-        st.pyplot(fig)
\ No newline at end of file
+        df_res.insert(1, "名稱", [names_map.get(code, "") for code in df_res["代碼"]])
+        hit_views.show(screener.hits_from(df_res, frames), names_map)
+
+    if sweep_mode:
+        st.subheader(f"📊 參數掃描（報酬以訊號後 {sweep.HORIZON} 日計）")
+        if not low_memory:
+            candidates = pipeline.stage("sweep", scan, lambda: sweep.prepare(frames))
+        tables = sweep.sweep(candidates, sweep.VOL_MULTS, sweep.MIN_DAYS)
+        for title, table in tables.items():
+            st.markdown(f"**{title}**")
+            st.dataframe(table)
@@ -0,0 +1,89 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import market_index
+import parallel_screener
+import screener
+import symbol_master
+from fetch_pool import iter_histories
+
+HORIZONS = (5, 10, 20)
+
+
+# 取出每個訊號之後 horizon 根K棒的收盤價（含進場當根），超出資料範圍的位置為 NaN
+def _forward_window(close, rows, cols, horizon):
+    offsets = rows[:, None] + np.arange(horizon + 1)[None, :]
+    inside = offsets < len(close)
+    window = close[np.minimum(offsets, len(close) - 1), cols[:, None]]
+    return np.where(inside, window, np.nan)
+
+
+# 用與篩選器完全相同的條件，對整段歷史的每一根K棒、每一檔股票一次回測
+# 回傳 (逐筆訊號, 每檔統計, 整體統計)；報酬為訊號當日收盤買進、持有 N 根後收盤賣出，
+# 最大回撤為持有期間（最長的 horizon）內從高點回落的最大幅度；workers 指定時指標以多個行程計算
+def run_backtest(frames, vol_mult=2.0, min_days=30, horizons=HORIZONS, workers=None):
+    panel = screener.build_panel(frames)
+    if workers:
+        features = parallel_screener.compute_features(panel, workers)
+    else:
+        features = screener.compute_features(panel)
+    rows, cols = np.nonzero(screener.signal_mask(panel, features, vol_mult, min_days))
+
+    window = _forward_window(panel.close, rows, cols, max(horizons))
+    entry = window[:, 0]
+    events = pd.DataFrame({
+        "代碼": np.array(panel.codes, dtype=object)[cols],
+        "日期": panel.dates[rows, cols],
+        "進場價": entry,
+    })
+    for h in horizons:
+        events[f"報酬{h}日"] = window[:, h] / entry - 1
+    with np.errstate(invalid="ignore"):
+        peak = np.fmax.accumulate(window, axis=1)
+        events["最大回撤"] = np.nanmin(window / peak - 1, axis=1) if len(window) else np.array([])
+    events = events.sort_values(["日期", "代碼"], ignore_index=True)
+
+    main = f"報酬{horizons[0]}日"
+    by_code = events.groupby("代碼").agg(
+        次數=(main, "size"),
+        平均報酬=(main, "mean"),
+        勝率=(main, lambda r: (r.dropna() > 0).mean()),
+        平均最大回撤=("最大回撤", "mean"),
+    )
+    summary = {"訊號次數": len(events), "股票數": events["代碼"].nunique()}
+    for h in horizons:
+        returns = events[f"報酬{h}日"].dropna()
+        summary[f"平均報酬{h}日"] = returns.mean()
+        summary[f"中位數報酬{h}日"] = returns.median()
+        summary[f"勝率{h}日"] = (returns > 0).mean()
+    summary["平均最大回撤"] = events["最大回撤"].mean()
+    summary["最差回撤"] = events["最大回撤"].min()
+    return events, by_code, summary
+
+
+def load_frames(codes, period):
+    frames = {}
+    for symbol, df in iter_histories([market_index.symbol_for(code) for code in codes], period):
+        if not df.empty:
+            frames[symbol.split(".")[0]] = df
+    return frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EMA6/EMA30 金叉 + 爆量 歷史回測")
+    parser.add_argument("codes", nargs="*", help="股票代碼，省略時使用整份股票主檔")
+    parser.add_argument("--period", default="10y")
+    parser.add_argument("--vol-mult", type=float, default=2.0)
+    parser.add_argument("--min-days", type=int, default=30)
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(HORIZONS))
+    parser.add_argument("--workers", type=int, help="以多個行程計算指標，例如 --workers 32")
+    args = parser.parse_args()
+
+    codes = args.codes or list(symbol_master.names())
+    frames = load_frames(codes, args.period)
+    events, by_code, summary = run_backtest(frames, args.vol_mult, args.min_days, tuple(args.horizons), args.workers)
+    for key, value in summary.items():
+        print(f"{key}：{value:.4f}" if isinstance(value, float) else f"{key}：{value}")
+    print(by_code.sort_values("次數", ascending=False).head(20).to_string())
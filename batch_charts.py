@@ -0,0 +1,76 @@
+from collections import namedtuple
+from io import BytesIO
+
+import matplotlib
+import matplotlib.pyplot as plt
+import mplfinance as mpf
+
+import chart_cache
+import indicators
+import process_pool
+from ohlcv import OHLCV
+
+# code：股票代碼；title：圖標題；bars：已下載的K棒（DataFrame 或 OHLCV）
+ChartJob = namedtuple("ChartJob", "code title bars")
+
+SPANS = (6, 30)
+COLORS = {6: "orange", 30: "blue"}
+VISIBLE_BARS = 22
+# 圖的樣式有改動時換掉這個版本字串，舊的快取圖就不會再被使用
+STYLE = "batch-red-green-v1"
+
+
+# EMA 用完整資料計算，只畫最後 visible 根
+def _figure(bars, title, spans, visible):
+    data = bars.to_frame().iloc[-visible:]
+    emas = indicators.ema_matrix(bars.close, spans)[-visible:]
+    apds = [mpf.make_addplot(emas[:, i], color=COLORS.get(span)) for i, span in enumerate(spans)]
+    mc = mpf.make_marketcolors(up='red', down='green')
+    fig, _ = mpf.plot(data, type='candle', style=mpf.make_mpf_style(marketcolors=mc),
+                      addplot=apds, returnfig=True, volume=True, title=title)
+    return fig
+
+
+# 在子行程執行
+def _draw(bars, title, spans, visible, fmt):
+    # 子行程沒有視窗，只用 Agg 畫到記憶體
+    matplotlib.use("Agg")
+    fig = _figure(bars, title, spans, visible)
+    buf = BytesIO()
+    fig.savefig(buf, format=fmt, **chart_cache.SAVEFIG)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def _prepare(job, spans, visible):
+    bars = job.bars if isinstance(job.bars, OHLCV) else OHLCV.from_frame(job.bars)
+    frame = bars.tail(1).to_frame()
+    key = chart_cache.make_key(job.code, "1d", chart_cache.last_bar(frame), (STYLE, job.title, visible), spans)
+    return key, bars
+
+
+# 一次畫好所有圖：先查 chart_cache，沒有的才以精簡的 OHLCV 送進行程池平行繪製並寫回快取。
+# 回傳與 jobs 順序相同的圖檔內容（bytes）
+def render_all(jobs, spans=SPANS, visible=VISIBLE_BARS, fmt="png", workers=None):
+    jobs = list(jobs)
+    images = [None] * len(jobs)
+    pending = {}
+    for i, job in enumerate(jobs):
+        key, bars = _prepare(job, spans, visible)
+        images[i] = chart_cache.get(key, fmt)
+        if images[i] is None:
+            pending[i] = (key, bars)
+    if pending:
+        pool = process_pool.executor(workers)
+        futures = {i: pool.submit(_draw, bars, jobs[i].title, tuple(spans), visible, fmt)
+                   for i, (key, bars) in pending.items()}
+        for i, future in futures.items():
+            images[i] = future.result()
+            chart_cache.put(pending[i][0], images[i], fmt)
+    return images
+
+
+# 只畫一張（例如使用者展開某一列時）：直接在本行程畫，同樣經過 chart_cache
+def render_one(job, spans=SPANS, visible=VISIBLE_BARS, fmt="png"):
+    key, bars = _prepare(job, spans, visible)
+    return chart_cache.render(key, lambda: _figure(bars, job.title, tuple(spans), visible), fmt)
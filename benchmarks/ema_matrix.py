@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators  # noqa: E402
+
+SPANS = (6, 12, 30, 60, 90, 180)
+# ema_matrix 比直接呼叫 pandas 慢超過這個倍數就視為退步
+MAX_RATIO = 3.0
+
+
+def best(fn, repeat=3, number=1):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def pandas_ema(values, spans):
+    frame = pd.DataFrame(values)
+    return [frame.ewm(span=span, adjust=True).mean().to_numpy() for span in spans]
+
+
+# 單一序列 6 個 span、整個市場面板 EMA6／EMA30，與 pandas 比較；退步時以非零狀態結束
+def main():
+    rng = np.random.default_rng(0)
+    series = 100 + np.cumsum(rng.standard_normal(2500))
+    panel = 100 + np.cumsum(rng.standard_normal((2500, 1800)), axis=0)
+    cases = [
+        ("2500 根 × 6 spans × 200 次", lambda: indicators.ema_matrix(series, SPANS),
+         lambda: pandas_ema(series, SPANS), 200),
+        ("100k 根 × 1 span", lambda: indicators.ema_matrix(np.tile(series, 40), (6,)),
+         lambda: pandas_ema(np.tile(series, 40), (6,)), 1),
+        ("2500 × 1800 面板 × (6, 30)", lambda: indicators.ema_matrix(panel, (6, 30)),
+         lambda: pandas_ema(panel, (6, 30)), 1),
+    ]
+    failed = False
+    for name, ours, reference, number in cases:
+        mine, theirs = best(ours, number=number), best(reference, number=number)
+        ok = mine < MAX_RATIO * theirs
+        failed |= not ok
+        print(f"{name}: ema_matrix {mine:.3f}s, pandas {theirs:.3f}s {'OK' if ok else '退步'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import time
+from collections import deque
+
+import yfinance as yf
+
+# 每批下載的檔數
+CHUNK_SIZE = 100
+# 單一批次最多重試次數與第一次重試前的等待秒數（之後每次加倍）
+MAX_RETRIES = 3
+BACKOFF = 2.0
+
+
+def _download_chunk(tickers, period, interval):
+    data = yf.download(tickers, period=period, interval=interval, group_by="ticker",
+                       threads=True, progress=False)
+    if data.empty:
+        raise RuntimeError(f"整批下載失敗：{tickers[0]} ~ {tickers[-1]}")
+    frames = {}
+    for ticker in tickers:
+        try:
+            df = data[ticker].dropna()
+        except KeyError:
+            continue
+        if not df.empty:
+            frames[ticker] = df
+    return frames
+
+
+# 把清單切成多批依序下載，每批完成就交給呼叫端處理後才抓下一批；
+# 失敗的批次排到最後並以指數退避重試，不影響其他批次
+def iter_chunks(tickers, period="3mo", interval="1d", chunk_size=CHUNK_SIZE,
+                retries=MAX_RETRIES, backoff=BACKOFF):
+    pending = deque((tickers[i:i + chunk_size], 0, 0.0) for i in range(0, len(tickers), chunk_size))
+    while pending:
+        chunk, attempt, not_before = pending.popleft()
+        wait = not_before - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            frames = _download_chunk(chunk, period, interval)
+        except Exception as e:
+            if attempt < retries:
+                pending.append((chunk, attempt + 1, time.monotonic() + backoff * 2 ** attempt))
+                continue
+            print(f"錯誤：{e}")
+            frames = {}
+        yield chunk, frames
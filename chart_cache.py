@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+
+import price_store
+
+# 畫好的圖存成檔案：data_store/charts/<key>.<格式>；
+# 同一檔股票、同一根最新K棒、同樣的樣式與指標只畫一次，之後直接讀檔，不經過 matplotlib
+CACHE_DIR = os.path.join(os.path.dirname(price_store.STORE_DIR), "charts")
+# 快取總大小上限，超過時從最久沒被讀取的圖開始刪
+MAX_BYTES = 200 * 1024 * 1024
+# 與 st.pyplot 預設相同的存檔參數，快取的圖與直接顯示的一樣
+SAVEFIG = {"bbox_inches": "tight", "dpi": 200}
+
+_lock = threading.Lock()
+_key_locks = {}
+
+
+# 最新一根K棒以 時間、收盤、成交量 表示，盤中K棒還在變動時也會換成新的 key
+def last_bar(data):
+    if data.empty:
+        return None
+    return (data.index[-1].isoformat(), float(data["Close"].iloc[-1]), int(data["Volume"].iloc[-1]))
+
+
+def make_key(code, interval, bar, style, indicators):
+    text = repr((code, interval, bar, style, tuple(indicators)))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _path(key, fmt):
+    return os.path.join(CACHE_DIR, f"{key}.{fmt}")
+
+
+def get(key, fmt="png"):
+    path = _path(key, fmt)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    # 讀取時更新修改時間，淘汰時依此判斷最近使用
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return data
+
+
+def put(key, data, fmt="png"):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(key, fmt)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    evict()
+
+
+# 總大小超過 max_bytes 時，依最後使用時間由舊到新刪除
+def evict(max_bytes=MAX_BYTES):
+    entries = []
+    with os.scandir(CACHE_DIR) as it:
+        for entry in it:
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+# 取得 key 對應的圖；沒有快取時呼叫 draw() 取得 Figure 並存檔。
+# 同一個 key 同時被多個使用者要求時只有一個會真的畫圖
+def render(key, draw, fmt="png"):
+    data = get(key, fmt)
+    if data is not None:
+        return data
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        data = get(key, fmt)
+        if data is None:
+            fig = draw()
+            buf = BytesIO()
+            fig.savefig(buf, format=fmt, **SAVEFIG)
+            plt.close(fig)
+            data = buf.getvalue()
+            put(key, data, fmt)
+    with _lock:
+        _key_locks.pop(key, None)
+    return data
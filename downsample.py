@@ -0,0 +1,70 @@
+import math
+
+import mplfinance as mpf
+import numpy as np
+import pandas as pd
+
+# 一張圖最多畫幾根K棒；超過時把相鄰K棒合併，畫圖時間不隨資料長度增加
+MAX_CANDLES = 300
+# EMA 線每根K棒保留的點數（LTTB 取樣）
+LINE_POINTS = 2
+
+
+def bucket_size(n, max_bars=MAX_CANDLES):
+    return max(1, math.ceil(n / max_bars))
+
+
+# 每 k 根合併成一根：開取第一根、高取最大、低取最小、收取最後一根、量加總。
+# 分組從最後一根往前算，最新的K棒一定是完整的一組，不足 k 根的只會是最舊的那組
+def bucket_ohlcv(data, k):
+    if k == 1 or data.empty:
+        return data
+    n = len(data)
+    m = math.ceil(n / k)
+    starts = np.maximum(n - k * m + k * np.arange(m), 0)
+    ends = np.r_[starts[1:], n] - 1
+    return pd.DataFrame({
+        "Open": data["Open"].to_numpy()[starts],
+        "High": np.maximum.reduceat(data["High"].to_numpy(), starts),
+        "Low": np.minimum.reduceat(data["Low"].to_numpy(), starts),
+        "Close": data["Close"].to_numpy()[ends],
+        "Volume": np.add.reduceat(data["Volume"].to_numpy(), starts),
+    }, index=data.index[starts])
+
+
+# 原始第 i 根K棒在合併後圖上的 x 座標（mplfinance 的 x 軸是K棒序號），可為小數
+def positions(n, k):
+    origin = n - k * math.ceil(n / k)
+    return (np.arange(n) - origin - (k - 1) / 2) / k
+
+
+# Largest-Triangle-Three-Buckets：把折線取樣成 threshold 個點，保留視覺上的高低起伏
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        nxt = slice(hi, min(int((i + 2) * every) + 1, n))
+        avg_x, avg_y = x[nxt].mean(), y[nxt].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+# 依 max_bars 自動合併K棒後用 mplfinance 畫圖，lines（名稱 → (數值, 顏色)）以 LTTB 取樣後畫在主圖；
+# 回傳 (fig, axes, x)，x 為每根原始K棒在圖上的位置，方便標註文字
+def plot(data, lines, max_bars=MAX_CANDLES, **kwargs):
+    k = bucket_size(len(data), max_bars)
+    fig, axes = mpf.plot(bucket_ohlcv(data, k), returnfig=True, **kwargs)
+    x = positions(len(data), k)
+    for label, (values, color) in lines.items():
+        values = np.asarray(values, dtype=float)
+        keep = lttb(x, values, LINE_POINTS * max_bars)
+        axes[0].plot(x[keep], values[keep], color=color, label=label)
+    return fig, axes, x
@@ -0,0 +1,173 @@
+import os
+import threading
+
+import numpy as np
+
+import price_store
+
+# EMA 狀態與價格資料庫放在一起：data_store/ema_state/<週期>.npz
+STATE_DIR = os.path.join(os.path.dirname(price_store.STORE_DIR), "ema_state")
+
+# 同一行程內的多個工作階段（Streamlit 每個 session 一個執行緒）共用狀態檔，存檔時依序進行
+_lock = threading.Lock()
+
+
+def _epoch(index):
+    return index.as_unit("s").asi8
+
+
+# 每檔股票、每個 span 只保留 EMA 的分子與分母（與 pandas ewm(adjust=True) 相同的權重），
+# 新K棒進來只需 O(1) 更新；同一時間的K棒再次送入時視為盤中更新，取代最後一根
+class EMAState:
+    def __init__(self, spans, interval="1d"):
+        self.spans = tuple(spans)
+        self.interval = interval
+        self.decay = 1 - 2 / (np.array(self.spans, dtype=float) + 1)
+        self.symbols = []
+        self.index = {}
+        n = len(self.spans)
+        self.num = np.zeros((0, n))
+        self.den = np.zeros((0, n))
+        self.prev_num = np.zeros((0, n))
+        self.prev_den = np.zeros((0, n))
+        self.last_ts = np.zeros(0, dtype=np.int64)
+        # 最後一根K棒送入時的收盤，用來發現歷史價格被重新還原（除權息、分割）
+        self.last_close = np.zeros(0)
+
+    def _row(self, symbol):
+        return self.rows([symbol])[0]
+
+    # 取得（必要時建立）多檔的列位置，給 update_many 使用；新股票一次加入
+    def rows(self, symbols):
+        new = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.index]
+        if new:
+            self.index.update((symbol, len(self.symbols) + i) for i, symbol in enumerate(new))
+            self.symbols.extend(new)
+            empty = np.zeros((len(new), len(self.spans)))
+            self.num = np.vstack([self.num, empty])
+            self.den = np.vstack([self.den, empty])
+            self.prev_num = np.vstack([self.prev_num, empty])
+            self.prev_den = np.vstack([self.prev_den, empty])
+            self.last_ts = np.append(self.last_ts, np.full(len(new), -1, dtype=np.int64))
+            self.last_close = np.append(self.last_close, np.full(len(new), np.nan))
+        return np.array([self.index[symbol] for symbol in symbols], dtype=np.int64)
+
+    # 以完整歷史重新建立某檔的狀態
+    def seed(self, symbol, timestamps, closes):
+        row = self._row(symbol)
+        closes = np.asarray(closes, dtype=float)
+        weights = self.decay[None, :] ** np.arange(len(closes))[::-1, None]
+        self.num[row] = closes @ weights
+        self.den[row] = weights.sum(axis=0)
+        if len(closes) > 1:
+            self.prev_num[row] = closes[:-1] @ weights[1:]
+            self.prev_den[row] = weights[1:].sum(axis=0)
+        else:
+            self.prev_num[row] = 0.0
+            self.prev_den[row] = 0.0
+        self.last_ts[row] = timestamps[-1]
+        self.last_close[row] = closes[-1] if len(closes) else np.nan
+
+    # 送入一根K棒；時間與最後一根相同則取代它，比最後一根舊則忽略
+    def update(self, symbol, ts, close):
+        row = self._row(symbol)
+        if ts < self.last_ts[row]:
+            return
+        if ts > self.last_ts[row]:
+            self.prev_num[row] = self.num[row]
+            self.prev_den[row] = self.den[row]
+            self.last_ts[row] = ts
+        self.num[row] = self.prev_num[row] * self.decay + close
+        self.den[row] = self.prev_den[row] * self.decay + 1
+        self.last_close[row] = close
+
+    # 一次更新多檔（rows 不可重複），規則與 update 相同；回傳實際有更新的 rows
+    def update_many(self, rows, ts, closes):
+        rows = np.asarray(rows)
+        ts = np.asarray(ts, dtype=np.int64)
+        closes = np.asarray(closes, dtype=float)
+        keep = ts >= self.last_ts[rows]
+        rows, ts, closes = rows[keep], ts[keep], closes[keep]
+        new = ts > self.last_ts[rows]
+        moved = rows[new]
+        self.prev_num[moved] = self.num[moved]
+        self.prev_den[moved] = self.den[moved]
+        self.last_ts[moved] = ts[new]
+        self.num[rows] = self.prev_num[rows] * self.decay + closes[:, None]
+        self.den[rows] = self.prev_den[rows] * self.decay + 1
+        self.last_close[rows] = closes
+        return rows
+
+    # 用 DataFrame 推進狀態，只處理最後一根之後（含）的K棒；
+    # 第一次看到、中間有缺漏，或狀態的最後一根已收盤但收盤價與資料不同
+    # （除權息、分割後整段重新還原，或存檔時那根還在盤中）時才用整段資料重建。
+    # 回傳 (前一根, 最新一根) 各 span 的 EMA
+    def advance(self, symbol, data):
+        ts = _epoch(data.index)
+        closes = data["Close"].to_numpy(dtype=float)
+        row = self.index.get(symbol)
+        if row is None or self.last_ts[row] < ts[0] or self._stale(row, ts, closes):
+            self.seed(symbol, ts, closes)
+        else:
+            for i in np.flatnonzero(ts >= self.last_ts[row]):
+                self.update(symbol, ts[i], closes[i])
+        return self.previous(symbol), self.value(symbol)
+
+    def _stale(self, row, ts, closes):
+        i = np.searchsorted(ts, self.last_ts[row])
+        if i >= len(ts) - 1 or ts[i] != self.last_ts[row]:
+            return False
+        return not np.isclose(closes[i], self.last_close[row], rtol=1e-9, atol=0.0)
+
+    def value(self, symbol):
+        row = self.index[symbol]
+        return self.num[row] / self.den[row]
+
+    def previous(self, symbol):
+        row = self.index[symbol]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.prev_num[row] / self.prev_den[row]
+
+    # 併入另一份狀態：每檔保留最後一根K棒較新的那一份，相同時以自己的為準
+    def merge(self, other):
+        mine = self.rows(other.symbols)
+        newer = other.last_ts > self.last_ts[mine]
+        for name in ("num", "den", "prev_num", "prev_den", "last_ts", "last_close"):
+            getattr(self, name)[mine[newer]] = getattr(other, name)[newer]
+
+    # 在鎖內先併入檔案上別的工作階段存的狀態再寫回，不會互相蓋掉對方的股票
+    def save(self):
+        with _lock:
+            self.merge(load(self.spans, self.interval))
+            os.makedirs(STATE_DIR, exist_ok=True)
+            path = _path(self.interval)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+            np.savez(tmp, spans=np.array(self.spans), symbols=np.array(self.symbols, dtype=str),
+                     num=self.num, den=self.den, prev_num=self.prev_num, prev_den=self.prev_den,
+                     last_ts=self.last_ts, last_close=self.last_close)
+            os.replace(tmp, path)
+
+
+def _path(interval):
+    return os.path.join(STATE_DIR, f"{interval}.npz")
+
+
+# 讀取已存的狀態；沒有檔案或 span 組合不同時回傳新的空狀態
+def load(spans, interval="1d"):
+    state = EMAState(spans, interval)
+    path = _path(interval)
+    if not os.path.exists(path):
+        return state
+    with np.load(path) as saved:
+        if tuple(saved["spans"]) != state.spans:
+            return state
+        state.symbols = saved["symbols"].tolist()
+        state.index = {s: i for i, s in enumerate(state.symbols)}
+        state.num = saved["num"]
+        state.den = saved["den"]
+        state.prev_num = saved["prev_num"]
+        state.prev_den = saved["prev_den"]
+        state.last_ts = saved["last_ts"]
+        # 舊版狀態檔沒有 last_close：下次推進時各檔重建一次
+        state.last_close = saved["last_close"] if "last_close" in saved.files else np.full(len(state.symbols), np.nan)
+    return state
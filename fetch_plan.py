@@ -0,0 +1,39 @@
+import math
+
+import price_store
+
+# 台股一般交易時段 09:00–13:30 每天的K棒數（13:30 收盤那筆併入最後一根）
+BARS_PER_DAY = {"1d": 1, "5m": 54, "15m": 18, "30m": 9, "60m": 5}
+
+# 暖機後，資料起點之前的歷史對 EMA 的權重低於此比例
+WARMUP_TOLERANCE = 0.01
+
+# 日曆天 / 交易日（週末加國定假日），再多抓幾天緩衝
+CALENDAR_RATIO = 1.5
+CALENDAR_PAD = 3
+
+
+# 指標需要多少根暖機K棒：EMA 取捨去的權重 decay^n 低於 tolerance 所需的 n，
+# 移動平均則是視窗長度減一
+def warmup_bars(spans=(), windows=(), tolerance=WARMUP_TOLERANCE):
+    needed = [window - 1 for window in windows]
+    for span in spans:
+        decay = 1 - 2 / (span + 1)
+        needed.append(math.ceil(math.log(tolerance) / math.log(decay)))
+    return max(needed, default=0)
+
+
+# 取得 bars 根K棒要向資料庫要求的期間；分K 受 Yahoo 可回溯天數限制
+def history_period(interval, bars):
+    days = math.ceil(bars / BARS_PER_DAY[interval])
+    days = math.ceil(days * CALENDAR_RATIO) + CALENDAR_PAD
+    limit = price_store.RETENTION_DAYS.get(interval)
+    if limit is not None:
+        days = min(days, limit)
+    return f"{days}d"
+
+
+# 依要畫的指標決定抓多少資料：顯示 visible 根，再加上最長指標所需的暖機K棒；
+# 條件本身要求至少 min_bars 根歷史（例如最低天數）時取兩者較大者
+def plan(interval, visible, spans=(), windows=(), min_bars=0):
+    return history_period(interval, max(min_bars, visible + warmup_bars(spans, windows)))
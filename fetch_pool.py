@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import price_store
+
+# 同時連線數上限，太高容易被 Yahoo 限流
+MAX_WORKERS = 16
+
+
+# 以有限的執行緒數同時下載，每完成一檔就立刻交給呼叫端處理
+def iter_histories(symbols, period, interval="1d", max_workers=MAX_WORKERS):
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {pool.submit(price_store.get_history, s, period, interval): s for s in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"錯誤：{symbol} {e}")
+                data = pd.DataFrame(columns=price_store.COLUMNS)
+            yield symbol, data
+    finally:
+        # 呼叫端提早結束時，取消還沒開始的下載
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,34 @@
+import pandas as pd
+import streamlit as st
+
+import batch_charts
+import price_store
+from ohlcv import OHLCV
+
+# 每列展開時顯示的最近幾根K棒明細
+DETAIL_BARS = 5
+
+
+def _frame(bars):
+    return bars.to_frame() if isinstance(bars, OHLCV) else bars
+
+
+# 命中股票篩選時下載的K棒合併成一份 CSV（Excel 可直接開啟中文）
+def export_csv(hits):
+    parts = [_frame(hits.series[code])[price_store.COLUMNS].assign(代碼=code) for code in hits.table["代碼"]]
+    if not parts:
+        return b""
+    return pd.concat(parts).to_csv().encode("utf-8-sig")
+
+
+# 命中表、匯出按鈕，以及每一檔各自的圖表開關：只有打開的那一列才會畫圖
+def show(hits, names=None):
+    names = names or {}
+    st.dataframe(hits.table)
+    st.download_button("⬇ 下載命中股票的K線資料（CSV）", export_csv(hits), "hits.csv", "text/csv")
+    for code in hits.table["代碼"]:
+        title = f"{code} {names.get(code, '')}".strip()
+        if st.toggle(f"📈 {title}", key=f"hit_chart_{code}"):
+            bars = hits.series[code]
+            st.image(batch_charts.render_one(batch_charts.ChartJob(code, title, bars)), width="stretch")
+            st.dataframe(_frame(bars).tail(DETAIL_BARS))
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+# 快線與慢線的交叉遮罩：golden 為上穿（金叉）、death 為下穿（死叉）
+# fast、slow 可為 1-D（時間）或 2-D（時間 × 股票）陣列，第 0 列一律為 False
+def cross_masks(fast, slow):
+    fast = np.asarray(fast, dtype=float)
+    slow = np.asarray(slow, dtype=float)
+    golden = np.zeros(fast.shape, dtype=bool)
+    death = np.zeros(fast.shape, dtype=bool)
+    golden[1:] = (fast[:-1] < slow[:-1]) & (fast[1:] > slow[1:])
+    death[1:] = (fast[:-1] > slow[:-1]) & (fast[1:] < slow[1:])
+    return golden, death
+
+
+# 所有金叉與死叉事件的位置，格式同 np.nonzero：
+# 1-D 時為 (時間索引,)，2-D 時為 (時間索引, 股票索引)
+def crossovers(fast, slow):
+    golden, death = cross_masks(fast, slow)
+    return np.nonzero(golden), np.nonzero(death)
+
+
+# 股票數 × span 數至少這麼多時，所有股票與 span 一起沿時間推進一次（_ema_fused）；
+# 較少時每個 span 各呼叫一次 pandas 反而比較快
+FUSED_MIN_COLUMNS = 768
+
+
+# 一次算出多個 span 的 EMA，與 pandas ewm(span=span).mean()（adjust=True）逐位元相同，
+# 價格不變時 EMA 也完全不變，不會因浮點誤差產生假交叉。
+# values 可為 1-D（時間）或 2-D（時間 × 股票），NaN 視為該時間沒有資料；
+# 回傳在最後多一維 span：(時間, span) 或 (時間, 股票, span)
+def ema_matrix(values, spans):
+    values = np.asarray(values, dtype=float)
+    columns = values.reshape(len(values), int(np.prod(values.shape[1:])))
+    if len(columns) and columns.shape[1] * len(spans) >= FUSED_MIN_COLUMNS:
+        out = _ema_fused(columns, spans)
+    else:
+        out = _ema_pandas(columns, spans)
+    return out.reshape(values.shape + (len(spans),))
+
+
+# 每個 span 呼叫一次 pandas 的 ewm；以欄為主的排列讓 pandas 逐欄計算時不必再複製一次
+def _ema_pandas(columns, spans):
+    frame = pd.DataFrame(np.asfortranarray(columns))
+    out = np.empty((len(spans), columns.shape[1], len(columns)))
+    for i, span in enumerate(spans):
+        out[i] = frame.ewm(span=span, adjust=True).mean().to_numpy().T
+    return out.transpose(2, 1, 0)
+
+
+# 單次沿時間推進所有 股票 × span，每一步的運算與 pandas 的 ewm 迴圈完全相同：
+# 舊權重乘上 1 - alpha，新值權重為 1，價格與目前 EMA 相同時不更新。
+# 只適用每檔從第一根之後就沒有缺漏的資料（靠右對齊的面板）；中間有 NaN 的股票交給 pandas
+def _ema_fused(columns, spans):
+    length, count = columns.shape
+    valid = ~np.isnan(columns)
+    start = np.where(valid.any(axis=0), valid.argmax(axis=0), length)
+    alpha = 1.0 / (1.0 + (np.asarray(spans, dtype=float) - 1.0) / 2.0)
+    factor = (1.0 - alpha)[:, None]
+    # 依第一根出現的時間分組，該時間只需重設這些股票
+    order = np.argsort(start, kind="stable")
+    bounds = np.searchsorted(start[order], np.arange(length + 1))
+
+    out = np.empty((length, len(spans), count))
+    mean = np.full((len(spans), count), np.nan)
+    weight = np.ones((len(spans), count))
+    old = np.empty_like(weight)
+    new = np.empty_like(weight)
+    changed = np.empty(weight.shape, dtype=bool)
+    for t in range(length):
+        x = columns[t]
+        np.multiply(weight, factor, out=old)
+        np.multiply(mean, old, out=new)
+        new += x
+        np.add(old, 1.0, out=weight)
+        new /= weight
+        np.not_equal(mean, x, out=changed)
+        np.copyto(mean, new, where=changed)
+        if bounds[t] < bounds[t + 1]:
+            first = order[bounds[t]:bounds[t + 1]]
+            mean[:, first] = x[first]
+            weight[:, first] = 1.0
+        out[t] = mean
+    out = out.transpose(0, 2, 1)
+
+    gaps = np.flatnonzero((start < length) & (valid.sum(axis=0) != length - start))
+    if len(gaps):
+        out[:, gaps] = _ema_pandas(columns[:, gaps], spans)
+    return out
+
+
+def ema(values, span):
+    return ema_matrix(values, [span])[..., 0]
+
+
+# 與 pandas rolling(window).mean() 相同：視窗內有 NaN 時結果為 NaN
+def rolling_mean(values, window):
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    pad = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate([pad, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.concatenate([pad, np.cumsum(valid, axis=0)])
+    out = np.full(values.shape, np.nan)
+    full = counts[window:] - counts[:-window] == window
+    out[window - 1:] = np.where(full, (sums[window:] - sums[:-window]) / window, np.nan)
+    return out
@@ -0,0 +1,140 @@
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import ema_state
+import market_index
+import symbol_master
+
+Event = namedtuple("Event", "time code kind close volume")
+
+KINDS = ("金叉", "死叉", "爆量")
+# 與日線篩選相同：5 根均量（含當根）
+VOL_WINDOW = 5
+
+
+# 盤中 5 分K 監控：每檔只保留 EMA6／EMA30 狀態、前 4 根成交量與前一根收盤，
+# 每次只把新的（或正在形成的）K棒推進去，整個市場一起以陣列運算
+class IntradayMonitor:
+    def __init__(self, symbols, vol_mult=2.0, window=VOL_WINDOW):
+        self.symbols = list(symbols)
+        self.vol_mult = vol_mult
+        self.window = window
+        self.ema = ema_state.EMAState((6, 30), "5m")
+        self.row_of = dict(zip(self.symbols, self.ema.rows(self.symbols)))
+        n = len(self.symbols)
+        self.past_volume = np.full((n, window - 1), np.nan)
+        self.slot = np.zeros(n, dtype=np.int64)
+        self.cur_volume = np.full(n, np.nan)
+        self.cur_close = np.full(n, np.nan)
+        self.prev_close = np.full(n, np.nan)
+        # 目前這根K棒已經發出過的事件，同一根K棒每種事件只發一次
+        self.fired = np.zeros((n, len(KINDS)), dtype=bool)
+
+    # 送入同一時間的一批K棒；時間與上次相同視為正在形成的K棒，會取代上次的數值
+    def process(self, ts, rows, closes, volumes, emit=True):
+        rows = np.asarray(rows, dtype=np.int64)
+        closes = np.asarray(closes, dtype=float)
+        volumes = np.asarray(volumes, dtype=float)
+        valid = ~np.isnan(closes) & (ts >= self.ema.last_ts[rows])
+        rows, closes, volumes = rows[valid], closes[valid], np.nan_to_num(volumes[valid])
+
+        # 新的一根開始：上一根轉為已完成
+        moved = rows[ts > self.ema.last_ts[rows]]
+        done = moved[~np.isnan(self.cur_volume[moved])]
+        self.past_volume[done, self.slot[done]] = self.cur_volume[done]
+        self.slot[done] = (self.slot[done] + 1) % (self.window - 1)
+        self.prev_close[done] = self.cur_close[done]
+        self.fired[moved] = False
+
+        self.ema.update_many(rows, np.full(len(rows), ts), closes)
+        self.cur_volume[rows] = volumes
+        self.cur_close[rows] = closes
+        return self._events(ts, rows) if emit else []
+
+    def _events(self, ts, rows):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            value = self.ema.num[rows] / self.ema.den[rows]
+            prev = self.ema.prev_num[rows] / self.ema.prev_den[rows]
+        golden = (prev[:, 0] < prev[:, 1]) & (value[:, 0] > value[:, 1])
+        death = (prev[:, 0] > prev[:, 1]) & (value[:, 0] < value[:, 1])
+        past = self.past_volume[rows]
+        ma = (past.sum(axis=1) + self.cur_volume[rows]) / self.window
+        spike = ((self.cur_volume[rows] > self.vol_mult * ma) & (self.cur_close[rows] > self.prev_close[rows])
+                 & ~np.isnan(past).any(axis=1))
+
+        hits = np.stack([golden, death, spike], axis=1) & ~self.fired[rows]
+        self.fired[rows] |= hits
+        stamp = pd.Timestamp(ts, unit="s", tz="Asia/Taipei")
+        events = []
+        for i, k in zip(*np.nonzero(hits)):
+            row = rows[i]
+            events.append(Event(stamp, self.symbols[row].split(".")[0], KINDS[k],
+                                float(self.cur_close[row]), int(self.cur_volume[row])))
+        return events
+
+    # 依時間順序送入 時間 × 代號 的收盤與成交量表
+    def feed_frame(self, close, volume, emit=True):
+        rows = np.array([self.row_of[s] for s in close.columns], dtype=np.int64)
+        events = []
+        stamps = close.index.as_unit("s").asi8
+        for ts, c, v in zip(stamps, close.to_numpy(dtype=float), volume.to_numpy(dtype=float)):
+            events.extend(self.process(ts, rows, c, v, emit))
+        return events
+
+
+def _split(data, symbols):
+    close = data.xs("Close", axis=1, level=1).reindex(columns=symbols)
+    volume = data.xs("Volume", axis=1, level=1).reindex(columns=symbols)
+    return close, volume
+
+
+# 定時整批下載 5 分K；第一次抓 5 天暖機（不發事件），之後每次只送最後 lookback 根
+def poll_bulk(monitor, every=60, lookback=2):
+    symbols = monitor.symbols
+    data = yf.download(symbols, period="5d", interval="5m", group_by="ticker", threads=True, progress=False)
+    monitor.feed_frame(*_split(data, symbols), emit=False)
+    while True:
+        time.sleep(every)
+        data = yf.download(symbols, period="1d", interval="5m", group_by="ticker", threads=True, progress=False)
+        if data.empty:
+            continue
+        close, volume = _split(data.iloc[-lookback:], symbols)
+        yield from monitor.feed_frame(close, volume)
+
+
+# 重播本地檔案：CSV 欄位 Datetime, Ticker, Close, Volume（其他欄位會忽略）
+def replay(monitor, path):
+    bars = pd.read_csv(path, parse_dates=["Datetime"])
+    bars = bars[bars["Ticker"].isin(monitor.row_of)]
+    close = bars.pivot_table(index="Datetime", columns="Ticker", values="Close", aggfunc="last").sort_index()
+    volume = bars.pivot_table(index="Datetime", columns="Ticker", values="Volume", aggfunc="last").reindex_like(close)
+    if close.index.tz is None:
+        close.index = close.index.tz_localize("Asia/Taipei")
+    yield from monitor.feed_frame(close, volume)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="盤中 5 分K 金叉／爆量監控")
+    parser.add_argument("codes", nargs="*", help="股票代碼，省略時監控整份股票主檔")
+    parser.add_argument("--vol-mult", type=float, default=2.0)
+    parser.add_argument("--replay", help="重播 CSV 檔，不連網")
+    parser.add_argument("--poll", type=int, default=60, help="輪詢間隔秒數")
+    args = parser.parse_args()
+
+    if args.replay:
+        symbols = sorted(set(pd.read_csv(args.replay, usecols=["Ticker"])["Ticker"]))
+        if args.codes:
+            symbols = [s for s in symbols if s.split(".")[0] in args.codes]
+        monitor = IntradayMonitor(symbols, args.vol_mult)
+        events = replay(monitor, args.replay)
+    else:
+        codes = args.codes or list(symbol_master.names())
+        monitor = IntradayMonitor([market_index.symbol_for(code) for code in codes], args.vol_mult)
+        events = poll_bulk(monitor, args.poll)
+    for event in events:
+        print(f"{event.time:%Y-%m-%d %H:%M} {event.code} {event.kind} 收盤 {event.close} 量 {event.volume}")
@@ -0,0 +1,159 @@
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import market_index
+import symbol_master
+from third_rule import LEVEL_NAMES, third_rule_levels
+
+LevelEvent = namedtuple("LevelEvent", "time code kind level level_price price")
+
+KINDS = ("觸及", "突破", "跌破")
+
+# 檔位由低到高排列時對應的名稱（third_rule 的檔位是由高到低）
+ASCENDING_NAMES = LEVEL_NAMES[::-1]
+N_LEVELS = len(LEVEL_NAMES)
+
+
+def _taipei_day(ts):
+    return (int(ts) + 8 * 3600) // 86400
+
+
+# 三分之一法檔位監控：以前一日收盤算好每檔的 8 個檔位，盤中K棒進來時
+# 用 searchsorted 一次找出整個市場的最高／最低價區間涵蓋了哪些檔位，以及收盤穿越了哪些檔位。
+# 各檔的檔位加上「列號 × offset」後串成一條遞增陣列，所有股票只需一次 searchsorted。
+# 每個檔位、每種事件一天只發一次；換日時以前一日最後收盤重算檔位
+class LevelMonitor:
+    def __init__(self, symbols, ref_close=None):
+        self.symbols = list(symbols)
+        self.row_of = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.last_close = np.full(n, np.nan)
+        self.day = None
+        self.reset(np.full(n, np.nan) if ref_close is None else ref_close)
+
+    # 以新的參考價重算檔位，並清掉當日已發過的事件
+    def reset(self, ref_close):
+        n = len(self.symbols)
+        self.ref = np.asarray(ref_close, dtype=float)
+        base, levels = third_rule_levels(self.ref)
+        levels = levels[:, ::-1]
+        # 參考價太低時基礎數值為 0，8 個檔位都等於參考價，沒有意義
+        self.valid = ~np.isnan(self.ref) & (base > 0)
+        levels[~self.valid] = -1.0
+        self.levels = levels
+        self.offset = np.nanmax(levels, initial=0.0) * 2 + 2
+        self.first = np.arange(n, dtype=np.int64) * N_LEVELS
+        self.keys = (levels + (np.arange(n) * self.offset)[:, None]).ravel()
+        self.pos = self._count(np.arange(n), self.ref, "right")
+        self.fired = np.zeros((n, N_LEVELS, len(KINDS)), dtype=bool)
+
+    # 每檔有幾個檔位小於（left）或小於等於（right）指定價格
+    def _count(self, rows, prices, side):
+        prices = np.minimum(np.nan_to_num(prices, nan=-1.0), self.offset - 1)
+        return np.searchsorted(self.keys, prices + rows * self.offset, side=side) - self.first[rows]
+
+    # 送入同一時間的一批K棒；時間相同的K棒視為正在形成，區間擴大時只補發新碰到的檔位
+    def process(self, ts, rows, highs, lows, closes, emit=True):
+        day = _taipei_day(ts)
+        if self.day is not None and day != self.day:
+            self.reset(self.last_close)
+        self.day = day
+
+        rows = np.asarray(rows, dtype=np.int64)
+        highs = np.asarray(highs, dtype=float)
+        lows = np.asarray(lows, dtype=float)
+        closes = np.asarray(closes, dtype=float)
+        ok = ~np.isnan(closes)
+        rows, highs, lows, closes = rows[ok], highs[ok], lows[ok], closes[ok]
+        self.last_close[rows] = closes
+
+        lo = self._count(rows, lows, "left")
+        hi = self._count(rows, highs, "right")
+        pos = self._count(rows, closes, "right")
+        prev = self.pos[rows]
+        self.pos[rows] = pos
+
+        j = np.arange(N_LEVELS)
+        hits = np.stack([
+            (lo[:, None] <= j) & (j < hi[:, None]),
+            (prev[:, None] <= j) & (j < pos[:, None]),
+            (pos[:, None] <= j) & (j < prev[:, None]),
+        ], axis=2)
+        hits &= self.valid[rows, None, None] & ~self.fired[rows]
+        self.fired[rows] |= hits
+        return self._events(ts, rows, closes, hits) if emit else []
+
+    def _events(self, ts, rows, closes, hits):
+        stamp = pd.Timestamp(ts, unit="s", tz="Asia/Taipei")
+        events = []
+        for i, j, k in zip(*np.nonzero(hits)):
+            row = rows[i]
+            events.append(LevelEvent(stamp, self.symbols[row].split(".")[0], KINDS[k], ASCENDING_NAMES[j],
+                                     float(self.levels[row, j]), float(closes[i])))
+        return events
+
+    # 依時間順序送入 時間 × 代號 的最高、最低、收盤價表
+    def feed_frame(self, high, low, close, emit=True):
+        rows = np.array([self.row_of[s] for s in close.columns], dtype=np.int64)
+        events = []
+        stamps = close.index.as_unit("s").asi8
+        for ts, h, l, c in zip(stamps, high.to_numpy(dtype=float), low.to_numpy(dtype=float),
+                               close.to_numpy(dtype=float)):
+            events.extend(self.process(ts, rows, h, l, c, emit))
+        return events
+
+
+def _split(data, symbols):
+    return tuple(data.xs(field, axis=1, level=1).reindex(columns=symbols) for field in ("High", "Low", "Close"))
+
+
+# 定時整批下載 5 分K；先抓 5 天暖機（不發事件），前一日收盤即成為今天的參考價
+def poll_bulk(monitor, every=60, lookback=2):
+    symbols = monitor.symbols
+    data = yf.download(symbols, period="5d", interval="5m", group_by="ticker", threads=True, progress=False)
+    monitor.feed_frame(*_split(data, symbols), emit=False)
+    while True:
+        time.sleep(every)
+        data = yf.download(symbols, period="1d", interval="5m", group_by="ticker", threads=True, progress=False)
+        if data.empty:
+            continue
+        yield from monitor.feed_frame(*_split(data.iloc[-lookback:], symbols))
+
+
+# 重播本地檔案：CSV 欄位 Datetime, Ticker, High, Low, Close；第一天只用來取得參考價
+def replay(monitor, path):
+    bars = pd.read_csv(path, parse_dates=["Datetime"])
+    bars = bars[bars["Ticker"].isin(monitor.row_of)]
+    frames = [bars.pivot_table(index="Datetime", columns="Ticker", values=field, aggfunc="last").sort_index()
+              for field in ("High", "Low", "Close")]
+    frames = [frame.reindex_like(frames[2]) for frame in frames]
+    if frames[2].index.tz is None:
+        frames[2].index = frames[2].index.tz_localize("Asia/Taipei")
+    yield from monitor.feed_frame(*frames)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="盤中三分之一法檔位觸及／突破監控")
+    parser.add_argument("codes", nargs="*", help="股票代碼，省略時監控整份股票主檔")
+    parser.add_argument("--replay", help="重播 CSV 檔，不連網")
+    parser.add_argument("--poll", type=int, default=60, help="輪詢間隔秒數")
+    args = parser.parse_args()
+
+    if args.replay:
+        symbols = sorted(set(pd.read_csv(args.replay, usecols=["Ticker"])["Ticker"]))
+        if args.codes:
+            symbols = [s for s in symbols if s.split(".")[0] in args.codes]
+        monitor = LevelMonitor(symbols)
+        events = replay(monitor, args.replay)
+    else:
+        codes = args.codes or list(symbol_master.names())
+        monitor = LevelMonitor([market_index.symbol_for(code) for code in codes])
+        events = poll_bulk(monitor, args.poll)
+    for event in events:
+        print(f"{event.time:%Y-%m-%d %H:%M} {event.code} {event.kind} {event.level} "
+              f"{event.level_price} 現價 {event.price}")
@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+import symbol_master
+
+# 股票代號 → 市場後綴（上市 .TW／上櫃 .TWO）的本地索引，下載成功後會自動記住
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_store", "markets.json")
+
+_lock = threading.Lock()
+_index = None
+
+
+def _seed(index):
+    # 先帶入股票主檔裡的市場別
+    markets = symbol_master.load()["市場別"].dropna()
+    for code, market in markets.items():
+        index.setdefault(code, ".TWO" if market == "上櫃" else ".TW")
+
+
+def _load():
+    global _index
+    with _lock:
+        if _index is None:
+            try:
+                with open(INDEX_PATH, encoding="utf-8") as f:
+                    _index = json.load(f)
+            except (OSError, ValueError):
+                _index = {}
+            _seed(_index)
+        return _index
+
+
+def suffix_for(code):
+    return _load().get(code, ".TW")
+
+
+def symbol_for(code):
+    return f"{code}{suffix_for(code)}"
+
+
+def learn(code, suffix):
+    index = _load()
+    with _lock:
+        if index.get(code) == suffix and os.path.exists(INDEX_PATH):
+            return
+        index[code] = suffix
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        tmp = f"{INDEX_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, INDEX_PATH)
+
+
+# 先用索引裡的市場下載，只有查無資料才改試另一個市場並記住結果
+# fetch：傳入完整代號（如 2330.TW）、回傳 DataFrame 的函式
+def fetch_with_fallback(code, fetch):
+    first = suffix_for(code)
+    data = fetch(f"{code}{first}")
+    if not data.empty:
+        learn(code, first)
+        return f"{code}{first}", data
+    other = ".TWO" if first == ".TW" else ".TW"
+    other_data = fetch(f"{code}{other}")
+    if not other_data.empty:
+        learn(code, other)
+        return f"{code}{other}", other_data
+    return f"{code}{first}", data
@@ -0,0 +1,76 @@
+from collections import namedtuple
+from numbers import Integral
+
+import numpy as np
+import pandas as pd
+
+# 台股時區固定 UTC+8、沒有日光節約時間
+TZ = "Asia/Taipei"
+TZ_OFFSET = 8 * 3600
+
+FIELDS = ("ts", "open", "high", "low", "close", "volume")
+# 單一根K棒：ts 為 UTC epoch 秒，其餘為 Python 數值
+Bar = namedtuple("Bar", FIELDS)
+
+
+# 精簡的K棒容器：時間為 UTC epoch 秒（int64）、價格 float32、成交量 int64，各自是連續陣列。
+# 每根 32 bytes（yfinance 的 DataFrame 連同 Dividends、Stock Splits 與時區索引約 64 bytes 以上），
+# 切片回傳的是原陣列的 view，不複製資料；close、volume 可直接交給 indicators 與 screener
+class OHLCV:
+    __slots__ = FIELDS
+
+    def __init__(self, ts, open, high, low, close, volume):
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float32)
+        self.high = np.asarray(high, dtype=np.float32)
+        self.low = np.asarray(low, dtype=np.float32)
+        self.close = np.asarray(close, dtype=np.float32)
+        self.volume = np.asarray(volume, dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, data):
+        index = data.index
+        if index.tz is None:
+            index = index.tz_localize(TZ)
+        return cls(index.as_unit("s").asi8, data["Open"].to_numpy(), data["High"].to_numpy(),
+                   data["Low"].to_numpy(), data["Close"].to_numpy(),
+                   data["Volume"].fillna(0).to_numpy(dtype=np.int64))
+
+    def __len__(self):
+        return len(self.ts)
+
+    # 整數取第幾根K棒（Bar，可用負數從最後算起）；切片、布林或整數陣列回傳 OHLCV
+    def __getitem__(self, key):
+        if isinstance(key, Integral):
+            return Bar(*(getattr(self, field)[key].item() for field in FIELDS))
+        if isinstance(key, str):
+            raise TypeError(f"OHLCV 以位置取K棒，欄位請用屬性（例如 bars.close），不是 bars[{key!r}]")
+        return OHLCV(*(getattr(self, field)[key] for field in FIELDS))
+
+    def __repr__(self):
+        if not len(self):
+            return "OHLCV(0 bars)"
+        return f"OHLCV({len(self)} bars, {self.index[0]} ~ {self.index[-1]})"
+
+    def tail(self, n):
+        return self[-n:] if n else self[:0]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, field).nbytes for field in FIELDS)
+
+    # 台北當地時間（不含時區）的 datetime64[s]，與 screener 面板的日期格式相同
+    @property
+    def dates(self):
+        return (self.ts + TZ_OFFSET).astype("datetime64[s]")
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(pd.to_datetime(self.ts, unit="s", utc=True).tz_convert(TZ), name="Date")
+
+    # 轉回 mplfinance 等需要 DataFrame 的地方使用
+    def to_frame(self):
+        return pd.DataFrame({
+            "Open": self.open, "High": self.high, "Low": self.low,
+            "Close": self.close, "Volume": self.volume,
+        }, index=self.index)
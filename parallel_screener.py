@@ -0,0 +1,98 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import process_pool
+import screener
+
+# 股票數太少時切太細反而不划算
+MIN_SHARD = 64
+
+
+# 把陣列放進共享記憶體；回傳 (SharedMemory 物件, 給子行程的 (名稱, 形狀, dtype) 說明)
+def _share(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+# 子行程：取出 lo:hi 這幾檔的欄位，組成只有這些股票的 Panel
+def _shard_panel(specs, lo, hi):
+    shms, arrays = zip(*(_attach(spec) for spec in specs))
+    close, volume, counts = (array[..., lo:hi].copy() for array in arrays)
+    for shm in shms:
+        shm.close()
+    return screener.Panel(list(range(lo, hi)), None, close, volume, counts)
+
+
+def _features_task(specs, out_specs, lo, hi):
+    features = screener.compute_features(_shard_panel(specs, lo, hi))
+    for spec, values in zip(out_specs, features):
+        shm, out = _attach(spec)
+        out[:, lo:hi] = values
+        shm.close()
+
+
+def _screen_task(specs, lo, hi, vol_mult, min_days):
+    panel = _shard_panel(specs, lo, hi)
+    return lo, screener.screen(panel, screener.compute_features(panel), vol_mult, min_days)
+
+
+def _shards(n, workers):
+    count = max(1, min(workers, n // MIN_SHARD))
+    bounds = np.linspace(0, n, count + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# 在行程池裡執行 task；價格只放一份在共享記憶體，子行程依股票範圍各取所需，不傳 DataFrame
+def _run(panel, workers, submit):
+    workers = workers or process_pool.MAX_WORKERS
+    shared = [_share(np.ascontiguousarray(array)) for array in (panel.close, panel.volume, panel.counts)]
+    try:
+        specs = [spec for _, spec in shared]
+        pool = process_pool.executor(workers)
+        futures = [submit(pool, specs, lo, hi) for lo, hi in _shards(len(panel.codes), workers)]
+        return [future.result() for future in futures]
+    finally:
+        for shm, _ in shared:
+            shm.close()
+            shm.unlink()
+
+
+# 與 screener.compute_features 相同，但依股票分片給多個行程計算，結果直接寫回共享記憶體
+def compute_features(panel, workers=None):
+    if len(panel.codes) < 2 * MIN_SHARD:
+        return screener.compute_features(panel)
+    outputs = [_share(np.empty(panel.close.shape)) for _ in screener.Features._fields]
+    try:
+        out_specs = [spec for _, spec in outputs]
+        _run(panel, workers, lambda pool, specs, lo, hi: pool.submit(_features_task, specs, out_specs, lo, hi))
+        return screener.Features(*(np.ndarray(shape, dtype, buffer=shm.buf).copy()
+                                   for shm, (_, shape, dtype) in outputs))
+    finally:
+        for shm, _ in outputs:
+            shm.close()
+            shm.unlink()
+
+
+# 與 screener.screen 相同，整個流程（EMA、均量、交叉、條件）都在子行程完成，只傳回每檔的布林值
+def screen(panel, vol_mult, min_days, workers=None):
+    if len(panel.codes) < 2 * MIN_SHARD:
+        return screener.screen(panel, screener.compute_features(panel), vol_mult, min_days)
+    mask = np.zeros(len(panel.codes), dtype=bool)
+    parts = _run(panel, workers,
+                 lambda pool, specs, lo, hi: pool.submit(_screen_task, specs, lo, hi, vol_mult, min_days))
+    for lo, part in parts:
+        mask[lo:lo + len(part)] = part
+    return mask
+
+
+def screen_frames(frames, vol_mult, min_days, workers=None):
+    panel = screener.build_panel(frames)
+    return screener.hit_table(panel, screen(panel, vol_mult, min_days, workers))
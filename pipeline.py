@@ -0,0 +1,22 @@
+import streamlit as st
+
+# 篩選流程分成 下載 → 指標 → 篩選 三段：前兩段的結果各自以 key 快取在 session_state，
+# 調整滑桿時只會重跑最後的篩選，不會重新下載或重算指標
+
+
+# 按下「開始篩選」才開始新的一輪，下載與指標都會重新計算
+def new_scan():
+    st.session_state["scan_id"] = st.session_state.get("scan_id", 0) + 1
+
+
+def current_scan():
+    return st.session_state.get("scan_id")
+
+
+# name 階段的快取 key 與上次相同就直接回傳上次的結果，否則呼叫 compute 重算
+def stage(name, key, compute):
+    cache = st.session_state.setdefault("pipeline_stages", {})
+    cached = cache.get(name)
+    if cached is None or cached[0] != key:
+        cache[name] = (key, compute())
+    return cache[name][1]
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+import yfinance as yf
+
+# 本地 OHLCV 資料庫：每檔股票、每種週期各存一個 parquet 分區
+# data_store/ohlcv/<週期>/<代號>.parquet
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_store", "ohlcv")
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Yahoo 的價格依下載當時已知的除權息、分割還原；補抓的一段出現這些事件時，舊K棒需要重新還原
+ACTIONS = ["Dividends", "Stock Splits"]
+
+# 分區在這段時間內（秒）更新過就直接使用本地資料，不再向 Yahoo 補抓
+MAX_AGE = {"1d": 10 * 60, "5m": 60}
+
+# Yahoo 分K 可回溯的最長天數，本地也只保留這段期間
+RETENTION_DAYS = {"1m": 7, "5m": 60, "15m": 60, "30m": 60, "60m": 730}
+
+
+def _period_delta(period):
+    if period == "max":
+        return None
+    for unit, days in (("mo", 30), ("wk", 7), ("y", 365), ("d", 1)):
+        if period.endswith(unit):
+            return timedelta(days=int(period[:-len(unit)]) * days)
+    raise ValueError(f"不支援的期間：{period}")
+
+
+def _path(symbol, interval):
+    return os.path.join(STORE_DIR, interval, f"{symbol}.parquet")
+
+
+def load(symbol, interval):
+    path = _path(symbol, interval)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.read_parquet(path)
+
+
+def save(symbol, interval, data, since):
+    path = _path(symbol, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = data[COLUMNS].copy()
+    # since：此分區完整涵蓋的起始時間（"max" 代表全部歷史）
+    data.attrs["since"] = since
+    # 先寫暫存檔再換名，避免多執行緒同時讀到寫一半的檔案
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    data.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+# 回傳 (K棒, 期間內是否有除權息或分割)
+def _download(symbol, interval, **kwargs):
+    data = yf.Ticker(symbol).history(interval=interval, **kwargs)
+    if data.empty:
+        return data, False
+    actions = data.reindex(columns=ACTIONS).fillna(0).to_numpy().any()
+    return data[COLUMNS], bool(actions)
+
+
+def _is_fresh(symbol, interval):
+    path = _path(symbol, interval)
+    return time.time() - os.path.getmtime(path) < MAX_AGE.get(interval, 10 * 60)
+
+
+def _start(period):
+    delta = _period_delta(period)
+    if delta is None:
+        return None
+    return pd.Timestamp.now(tz="Asia/Taipei") - delta
+
+
+def _covers(cached, start):
+    since = cached.attrs.get("since")
+    return not cached.empty and since is not None and (
+        since == "max" or (start is not None and pd.Timestamp(since) <= start)
+    )
+
+
+# 先讀本地分區，只向 Yahoo 補抓缺少的最後一段；回傳範圍與 history(period=...) 相同
+def get_history(symbol, period, interval="1d"):
+    now = pd.Timestamp.now(tz="Asia/Taipei")
+    start = _start(period)
+    cached = load(symbol, interval)
+
+    data = None
+    if _covers(cached, start) and _is_fresh(symbol, interval):
+        data = cached
+    elif _covers(cached, start):
+        # 從最後一根K棒所在的那一天開始補，最後一根可能是盤中未完成的K棒
+        try:
+            tail, adjusted = _download(symbol, interval, start=cached.index[-1].strftime("%Y-%m-%d"))
+        except Exception as e:
+            print(f"錯誤：{e}")
+            tail, adjusted = cached.iloc[0:0], False
+        # 這段有除權息或分割時，Yahoo 已把之前的K棒重新還原，本地的舊K棒接上去會出現假缺口：整段重新下載
+        if not adjusted:
+            data = cached
+            if not tail.empty:
+                data = pd.concat([cached[cached.index < tail.index[0]], tail])
+            if interval in RETENTION_DAYS:
+                data = data[data.index >= now - timedelta(days=RETENTION_DAYS[interval])]
+            save(symbol, interval, data, cached.attrs["since"])
+    if data is None:
+        data, _ = _download(symbol, interval, period=period)
+        if data.empty:
+            return data
+        save(symbol, interval, data, "max" if start is None else start.isoformat())
+
+    if start is not None:
+        data = data[data.index >= start].copy()
+    return data
+
+
+# 只要 end 之前的K棒：分區涵蓋起點、而且在 end 之後更新過，就完全不必連網
+def get_history_until(symbol, period, end, interval="1d"):
+    start = _start(period)
+    cached = load(symbol, interval)
+    if _covers(cached, start) and os.path.getmtime(_path(symbol, interval)) >= end.timestamp():
+        data = cached
+    else:
+        data = get_history(symbol, period, interval)
+    if start is not None:
+        data = data[data.index >= start]
+    return data[data.index < end].copy()
@@ -0,0 +1,31 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# 預設用滿所有核心
+MAX_WORKERS = os.cpu_count() or 1
+
+_lock = threading.Lock()
+_executor = None
+_executor_workers = 0
+
+
+# 行程池只建立一次，Streamlit 每次重跑都沿用；用 spawn 避免在多執行緒的主程式裡 fork
+def executor(workers=None):
+    global _executor, _executor_workers
+    workers = workers or MAX_WORKERS
+    with _lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(cancel_futures=True)
+            _executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _executor_workers = workers
+        return _executor
+
+
+@atexit.register
+def _shutdown():
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
@@ -0,0 +1,43 @@
+import pandas as pd
+
+import price_store
+
+# 台股一般交易時段
+SESSION_OPEN = "09:00"
+SESSION_CLOSE = "13:30"
+
+AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+RULES = {"15m": "15min", "30m": "30min", "60m": "60min", "1d": "1D"}
+
+
+# 把 5 分K 合成為 15m／30m／60m／1d 的K棒，價格取開高低收、成交量加總
+def resample_ohlcv(data, interval):
+    if data.empty:
+        return data
+    data = data.between_time(SESSION_OPEN, SESSION_CLOSE)
+    # 13:30 收盤集合競價那根併入最後一格，不要自己成為一根K棒
+    close_ts = data.index.normalize() + pd.Timedelta(SESSION_CLOSE + ":00")
+    last_slot = close_ts - pd.Timedelta(minutes=5)
+    data = data.set_axis(data.index.where(data.index < close_ts, last_slot))
+    if interval == "1d":
+        bars = data.resample("1D").agg(AGG)
+        bars.index.name = "Date"
+    else:
+        # 分K 的時間格從每天 09:00 起算
+        bars = data.resample(RULES[interval], origin="start_day", offset="9h",
+                             label="left", closed="left").agg(AGG)
+    return bars.dropna(subset=["Open"])
+
+
+# 5 分K 範圍內的日K 直接由 5 分K 合成，只有更早的日K 才讀本地資料庫（必要時才連網）
+def daily_from_intraday(symbol, intraday, period):
+    if not intraday.empty:
+        # 第一天若不是從開盤開始（period 從現在往回推算），那天不完整，改用日K
+        first_day = intraday.index[0].normalize()
+        if intraday.index[0] > first_day + pd.Timedelta(SESSION_OPEN + ":00"):
+            intraday = intraday[intraday.index >= first_day + pd.Timedelta(days=1)]
+    recent = resample_ohlcv(intraday[price_store.COLUMNS], "1d")
+    if recent.empty:
+        return price_store.get_history(symbol, period, "1d")
+    older = price_store.get_history_until(symbol, period, recent.index[0], "1d")
+    return pd.concat([older, recent])
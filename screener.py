@@ -0,0 +1,94 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from ohlcv import OHLCV
+
+# codes：股票代碼；dates、close、volume：時間 × 股票 矩陣；counts：每檔實際K棒數
+Panel = namedtuple("Panel", "codes dates close volume counts")
+Features = namedtuple("Features", "ema6 ema30 ma5vol")
+# 篩選結果：table 為命中表，series 為每檔命中股票篩選時已下載的K棒（直接引用，不複製），
+# 畫圖、明細、匯出都從這裡切，不必再連網
+Hits = namedtuple("Hits", "table series")
+
+
+# 把每檔的收盤與成交量「靠右對齊」排成矩陣：每檔最新一根都在最後一列，
+# 歷史較短的前段補 NaN，與逐檔用 iloc[-1]／iloc[-2] 判斷的結果一致。
+# frames 的值可為 DataFrame 或 ohlcv.OHLCV；全部是 OHLCV 時收盤維持 float32
+def build_panel(frames):
+    codes = list(frames)
+    length = max((len(df) for df in frames.values()), default=0)
+    compact = bool(codes) and all(isinstance(df, OHLCV) for df in frames.values())
+    dates = np.full((length, len(codes)), np.datetime64("NaT"), dtype="datetime64[s]")
+    close = np.full((length, len(codes)), np.nan, dtype=np.float32 if compact else float)
+    volume = np.full((length, len(codes)), np.nan)
+    counts = np.zeros(len(codes), dtype=np.int64)
+    for j, code in enumerate(codes):
+        df = frames[code]
+        n = len(df)
+        if n and isinstance(df, OHLCV):
+            dates[length - n:, j] = df.dates
+            close[length - n:, j] = df.close
+            volume[length - n:, j] = df.volume
+        elif n:
+            index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+            dates[length - n:, j] = index.to_numpy().astype("datetime64[s]")
+            close[length - n:, j] = df["Close"].to_numpy(dtype=float)
+            volume[length - n:, j] = df["Volume"].to_numpy(dtype=float)
+        counts[j] = n
+    return Panel(codes, dates, close, volume, counts)
+
+
+def compute_features(panel):
+    emas = indicators.ema_matrix(panel.close, (6, 30))
+    return Features(
+        ema6=emas[..., 0],
+        ema30=emas[..., 1],
+        ma5vol=indicators.rolling_mean(panel.volume, 5),
+    )
+
+
+# 每一根K棒是否符合條件：EMA6 上穿 EMA30（金叉），且當日量 > 5 日均量 × vol_mult 並收紅，
+# 而且到該根為止至少已有 min_days 根歷史；回傳 時間 × 股票 的布林矩陣
+def signal_mask(panel, features, vol_mult, min_days):
+    length = len(panel.close)
+    golden = indicators.cross_masks(features.ema6, features.ema30)[0]
+    rising = np.zeros(panel.close.shape, dtype=bool)
+    rising[1:] = panel.close[1:] > panel.close[:-1]
+    spike = (panel.volume > vol_mult * features.ma5vol) & rising
+    seen = np.arange(1, length + 1)[:, None] - (length - panel.counts)[None, :]
+    return golden & spike & (seen >= max(min_days, 2))
+
+
+# 只看每檔最新一根K棒的篩選結果
+def screen(panel, features, vol_mult, min_days):
+    if len(panel.close) < 2:
+        return np.zeros(len(panel.codes), dtype=bool)
+    return signal_mask(panel, features, vol_mult, min_days)[-1]
+
+
+# 篩選結果整理成 代碼／收盤／成交量 表
+# 沒有任何K棒（沒有股票或全部下載失敗）時回傳欄位相同的空表
+def hit_table(panel, mask):
+    hits = np.flatnonzero(mask) if len(panel.close) else np.empty(0, dtype=np.int64)
+    return pd.DataFrame({
+        "代碼": [panel.codes[j] for j in hits],
+        "收盤": np.round(panel.close[-1:, hits].reshape(-1).astype(float), 2),
+        "成交量": panel.volume[-1:, hits].reshape(-1).astype(np.int64),
+    })
+
+
+# 一次篩選整批股票，回傳符合條件的 代碼／收盤／成交量
+def screen_frames(frames, vol_mult, min_days):
+    panel = build_panel(frames)
+    return hit_table(panel, screen(panel, compute_features(panel), vol_mult, min_days))
+
+
+def hits_from(table, frames):
+    return Hits(table, {code: frames[code] for code in table["代碼"]})
+
+
+def screen_hits(frames, vol_mult, min_days):
+    return hits_from(screen_frames(frames, vol_mult, min_days), frames)
@@ -1,12 +1,14 @@
 
 import streamlit as st
 import pandas as pd
-import mplfinance as mpf
 import matplotlib.pyplot as plt
 from goodinfo import GoodInfoStock
 from io import BytesIO
 import base64
 
+import batch_charts
+import symbol_master
+
 st.title("📈 台股飆股偵測器（GoodInfo + EMA 金叉 + 爆量）")
 
 # 選擇欲篩選的股票清單（可替換為多檔）
@@ -16,6 +18,7 @@ detect_days = st.slider("過去天數內爆量倍率", min_value=1.5, max_value=
 
 if st.button("開始篩選"):
     results = []
+    frames = {}
 
     for code in stock_list:
         code = code.strip()
@@ -38,7 +41,8 @@ if st.button("開始篩選"):
         spike = (last["Volume"] > detect_days * last["MA5Vol"]) and (last["Close"] > prev["Close"])
 
         if golden and spike:
-            results.append((code, stock.BasicInfo()["shortName"], last["Close"], last["Volume"]))
+            results.append((code, symbol_master.get_name(code), last["Close"], last["Volume"]))
+            frames[code] = df
 
     if not results:
         st.warning("找不到符合條件的飆股")
@@ -46,15 +50,8 @@ if st.button("開始篩選"):
         df_res = pd.DataFrame(results, columns=["代碼", "名稱", "收盤", "成交量"])
         st.dataframe(df_res)
 
-        for idx, row in df_res.iterrows():
-            code, name = row["代碼"], row["名稱"]
-            df = GoodInfoStock(code).PriceHistory(period='1m', interval='d').set_index("Date")
-
-            apds = [
-                mpf.make_addplot(df["Close"].ewm(span=6).mean(), color='orange'),
-                mpf.make_addplot(df["Close"].ewm(span=30).mean(), color='blue')
-            ]
-            mc = mpf.make_marketcolors(up='red', down='green')
-            fig, axlist = mpf.plot(df, type='candle', style=mpf.make_mpf_style(marketcolors=mc),
-                                   addplot=apds, returnfig=True, volume=True, title=f"{code} {name}")
-            st.pyplot(fig)
+        # 直接用篩選時已下載的 3 個月資料畫最近 1 個月，所有命中的圖一起在行程池裡畫
+        jobs = [batch_charts.ChartJob(code, f"{code} {name}", frames[code])
+                for code, name in zip(df_res["代碼"], df_res["名稱"])]
+        for image in batch_charts.render_all(jobs):
+            st.image(image, width="stretch")
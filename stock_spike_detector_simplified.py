@@ -1,7 +1,10 @@
 import streamlit as st
-import pandas as pd
 import yfinance as yf
-import mplfinance as mpf
+
+import hit_views
+import market_index
+import pipeline
+import screener
 
 st.title("📈 台股飆股偵測器（純 Yahoo Finance）")
 
@@ -12,47 +15,34 @@ codes = [c.strip() for c in codes_input.split(",") if c.strip()]
 # 爆量倍率設定
 vol_mult = st.slider("爆量倍率（當日量 > 前5日平均量 × N）", 1.5, 5.0, 2.0, 0.5)
 
-if st.button("開始篩選"):
-    spikes = []
+
+# 下載階段：結果以 scan 快取，調整滑桿或打開圖表時不會重新下載
+def fetch_stage():
+    frames = {}
     for code in codes:
         try:
             # 取得最近三個月的日線資料
-            df = yf.Ticker(f"{code}.TW").history(period="3mo", interval="1d")
+            df = yf.Ticker(market_index.symbol_for(code)).history(period="3mo", interval="1d")
         except Exception as e:
             continue
 
-        if df.empty or len(df) < 7:
+        if df.empty:
             continue
+        frames[code] = df
+    return frames
 
-        # 計算技術指標
-        df["EMA6"]   = df["Close"].ewm(span=6).mean()
-        df["EMA30"]  = df["Close"].ewm(span=30).mean()
-        df["MA5Vol"] = df["Volume"].rolling(5).mean()
 
-        last = df.iloc[-1]
-        prev = df.iloc[-2]
-
-        # 判斷 EMA6 上穿 EMA30（金叉）
-        golden = (prev["EMA6"] < prev["EMA30"]) and (last["EMA6"] > last["EMA30"])
-        # 判斷爆量且收紅
-        spike  = (last["Volume"] > vol_mult * last["MA5Vol"]) and (last["Close"] > prev["Close"])
+if st.button("開始篩選"):
+    pipeline.new_scan()
 
-        if golden and spike:
-            spikes.append((code, round(last["Close"], 2), int(last["Volume"])))
+scan = pipeline.current_scan()
+if scan is not None:
+    frames = pipeline.stage("fetch", scan, fetch_stage)
 
-    if not spikes:
+    # 一次計算所有股票的 EMA6／EMA30／5日均量，判斷金叉且爆量收紅
+    hits = screener.screen_hits(frames, vol_mult, 7)
+    if hits.table.empty:
         st.warning("找不到符合條件的飆股")
     else:
-        df_spike = pd.DataFrame(spikes, columns=["代碼", "收盤", "成交量"])
-        st.dataframe(df_spike)
-
-        # 顯示第一檔飆股的 K 線圖
-        sel = df_spike.iloc[0]["代碼"]
-        hist1m = yf.Ticker(f"{sel}.TW").history(period="1mo", interval="1d")
-        mc = mpf.make_marketcolors(up='red', down='green')
-        fig, axlist = mpf.plot(
-            hist1m, type='candle', mav=(6,30),
-            volume=True, returnfig=True,
-            style=mpf.make_mpf_style(marketcolors=mc)
-        )
-        st.pyplot(fig)
\ No newline at end of file
+        # K 線圖直接用篩選時下載的資料，打開哪一檔才畫哪一檔
+        hit_views.show(hits)
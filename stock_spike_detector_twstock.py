@@ -1,62 +1,51 @@
 import streamlit as st
-import pandas as pd
-import twstock
 import yfinance as yf
-import mplfinance as mpf
 
-st.title("📈 台股飆股偵測器（TwStock + Yahoo Finance）")
+import hit_views
+import market_index
+import pipeline
+import screener
+
+st.title("📈 台股飆股偵測器（Yahoo Finance）")
 
 # 輸入欲篩選的股票代碼（逗號分隔）
 input_codes = st.text_input("輸入股票代碼（逗號分隔，例如：2330,2454）")
 codes = [c.strip() for c in input_codes.split(",") if c.strip()]
 
 # 爆量倍率設定
-vol_mult = st.slider("爆量倍率（昨日5日平均量 × N）", 1.5, 5.0, 2.0, 0.5)
+vol_mult = st.slider("爆量倍率（當日量 > 近5日平均量 × N）", 1.5, 5.0, 2.0, 0.5)
 
-if st.button("開始篩選"):
-    spikes = []
+
+# 下載階段：結果以 scan 快取，調整滑桿或打開圖表時不會重新下載
+def fetch_stage():
+    frames = {}
     for code in codes:
-        # 使用 twstock 取得最近 5 日成交量平均
+        # 使用 yfinance 取得最近 3 個月日線資料；代碼錯誤或下載失敗的跳過
         try:
-            stock_tw = twstock.Stock(code)
-            recent_vol = pd.Series(stock_tw.capacity[-5:]).mean()
-        except:
+            df = yf.Ticker(market_index.symbol_for(code)).history(period="3mo", interval="1d")
+        except Exception as e:
+            print(f"錯誤：{e}")
             continue
-
-        # 使用 yfinance 取得最近 3 個月日線資料
-        df = yf.Ticker(f"{code}.TW").history(period="3mo", interval="1d")
-        if df.empty or len(df) < 30:
+        if df.empty:
             continue
+        frames[code] = df
+    return frames
 
-        # 計算技術指標
-        df["EMA6"] = df["Close"].ewm(span=6).mean()
-        df["EMA30"] = df["Close"].ewm(span=30).mean()
-        df["MA5Vol"] = df["Volume"].rolling(5).mean()
 
-        # 擷取前一日與當日
-        last = df.iloc[-1]
-        prev = df.iloc[-2]
-
-        # 判斷金叉與爆量
-        golden = (prev["EMA6"] < prev["EMA30"]) and (last["EMA6"] > last["EMA30"])
-        spike = (last["Volume"] > vol_mult * last["MA5Vol"]) and (last["Close"] > prev["Close"])
-
-        if golden and spike:
-            spikes.append((code, round(last["Close"],2), int(last["Volume"])))
-
-    if not spikes:
+if st.button("開始篩選"):
+    pipeline.new_scan()
+
+scan = pipeline.current_scan()
+if scan is not None:
+    frames = pipeline.stage("fetch", scan, fetch_stage)
+    skipped = [code for code in codes if code not in frames]
+    if skipped:
+        st.info(f"查無資料，已略過：{', '.join(skipped)}")
+
+    # 一次計算所有股票的技術指標，判斷金叉與爆量
+    hits = screener.screen_hits(frames, vol_mult, 30)
+    if hits.table.empty:
         st.warning("找不到符合條件的飆股")
     else:
-        df_spike = pd.DataFrame(spikes, columns=["代碼","收盤","成交量"])
-        st.dataframe(df_spike)
-
-        # 顯示第一檔飆股的 K 線圖
-        sel = df_spike.iloc[0]
-        df2 = yf.Ticker(f"{sel['代碼']}.TW").history(period="1mo")
-        mc = mpf.make_marketcolors(up='red', down='green')
-        fig, axlist = mpf.plot(
-            df2, type='candle', mav=(6,30),
-            volume=True, returnfig=True,
-            style=mpf.make_mpf_style(marketcolors=mc)
-        )
-        st.pyplot(fig)
+        # K 線圖直接用篩選時下載的資料，打開哪一檔才畫哪一檔
+        hit_views.show(hits)
@@ -0,0 +1,106 @@
+import gc
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import fetch_plan
+import indicators
+import screener
+from bulk_download import CHUNK_SIZE, iter_chunks
+from ohlcv import OHLCV
+
+# 預設記憶體上限（MB），適用 1 GB 的容器
+MAX_RSS_MB = 768
+# 用量超過上限的這個比例就把每批檔數減半，低於 LOW_WATER 再慢慢放大回來
+HIGH_WATER = 0.8
+LOW_WATER = 0.5
+MIN_CHUNK = 10
+# 候選股保留畫 K 線需要的最後幾根（以精簡的 OHLCV 保存）：圖上的 30 根再加上 EMA30 的暖機K棒，
+# 圖上的 EMA 才與篩選時算出的值一致
+CHART_BARS = 30 + fetch_plan.warmup_bars((6, 30), (5,))
+
+# 每檔只留判斷最新一根需要的數值：收盤、成交量、5 日均量、已有天數，
+# 以及「金叉且收紅」（與爆量倍率、最低天數無關，可先算好）
+Summary = namedtuple("Summary", "codes close volume ma5vol seen candidate")
+
+
+# 目前行程的常駐記憶體（bytes）；讀不到 /proc 時回傳 0，不做調整
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def summarize(frames):
+    panel = screener.build_panel(frames)
+    if len(panel.close) < 2:
+        empty = np.zeros(len(panel.codes))
+        return Summary(panel.codes, empty, empty, empty, panel.counts, empty.astype(bool))
+    features = screener.compute_features(panel)
+    golden = indicators.cross_masks(features.ema6[-2:], features.ema30[-2:])[0][-1]
+    rising = panel.close[-1] > panel.close[-2]
+    return Summary(panel.codes, panel.close[-1], panel.volume[-1], features.ma5vol[-1],
+                   panel.counts, golden & rising)
+
+
+def merge(parts):
+    parts = list(parts)
+    if not parts:
+        return summarize({})
+    codes = [code for part in parts for code in part.codes]
+    return Summary(codes, *(np.concatenate(field) for field in list(zip(*parts))[1:]))
+
+
+# 與 screener.screen 相同的條件，只用每檔的摘要判斷
+def verdict(summary, vol_mult, min_days):
+    with np.errstate(invalid="ignore"):
+        spike = summary.volume > vol_mult * summary.ma5vol
+    return summary.candidate & spike & (summary.seen >= max(min_days, 2))
+
+
+def hit_table(summary, mask):
+    hits = np.flatnonzero(mask)
+    return pd.DataFrame({
+        "代碼": [summary.codes[j] for j in hits],
+        "收盤": np.round(summary.close[hits].astype(float), 2),
+        "成交量": summary.volume[hits].astype(np.int64),
+    })
+
+
+# 分批下載、分批計算，每批算完只留摘要與候選股最後幾根K棒就丟掉原始資料；
+# 每批結束後檢查常駐記憶體，接近 max_rss_mb 時縮小批次，寬鬆時再放大（不超過 chunk_size）。
+# on_chunk 可在每批原始資料丟掉前再取出其他摘要（例如 sweep.prepare）
+def stream(tickers, period="3mo", interval="1d", chunk_size=CHUNK_SIZE, max_rss_mb=MAX_RSS_MB,
+           chart_bars=CHART_BARS, progress=None, on_chunk=None):
+    limit = max_rss_mb * 1024 * 1024
+    size = chunk_size
+    parts = []
+    charts = {}
+    done = 0
+    while done < len(tickers):
+        chunk = tickers[done:done + size]
+        frames = {ticker.split(".")[0]: df
+                  for _, chunk_frames in iter_chunks(chunk, period=period, interval=interval, chunk_size=len(chunk))
+                  for ticker, df in chunk_frames.items()}
+        part = summarize(frames)
+        parts.append(part)
+        charts.update({code: OHLCV.from_frame(frames[code].tail(chart_bars))
+                       for code, keep in zip(part.codes, part.candidate) if keep})
+        if on_chunk is not None:
+            on_chunk(frames)
+        del frames
+        gc.collect()
+
+        done += len(chunk)
+        if progress is not None:
+            progress(done, len(tickers))
+        rss = rss_bytes()
+        if rss > HIGH_WATER * limit:
+            size = max(MIN_CHUNK, size // 2)
+        elif rss < LOW_WATER * limit:
+            size = min(chunk_size, size + max(1, size // 2))
+    return merge(parts), charts
@@ -0,0 +1,70 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import screener
+
+# 預設網格與偵測器的滑桿範圍相同
+VOL_MULTS = [1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0]
+MIN_DAYS = [20, 30, 40, 50, 60, 70, 80, 90]
+HORIZON = 5
+
+# 只保留「金叉且收紅」的候選K棒，爆量倍率與最低天數留到掃描時再判斷
+# volume、ma5vol、seen、returns 都是一維（每個候選一筆），latest 表示是否為該檔最新一根
+Candidates = namedtuple("Candidates", "codes volume ma5vol seen latest returns")
+
+
+# 特徵只算一次：EMA、5 日均量、已有天數與持有 horizon 根後的報酬
+def prepare(frames, horizon=HORIZON):
+    panel = screener.build_panel(frames)
+    features = screener.compute_features(panel)
+    length = len(panel.close)
+    golden = indicators.cross_masks(features.ema6, features.ema30)[0]
+    rising = np.zeros(panel.close.shape, dtype=bool)
+    rising[1:] = panel.close[1:] > panel.close[:-1]
+    rows, cols = np.nonzero(golden & rising)
+
+    ahead = rows + horizon
+    exit_price = np.where(ahead < length, panel.close[np.minimum(ahead, length - 1), cols], np.nan)
+    return Candidates(
+        codes=np.array(panel.codes, dtype=object)[cols],
+        volume=panel.volume[rows, cols],
+        ma5vol=features.ma5vol[rows, cols],
+        seen=rows + 1 - (length - panel.counts[cols]),
+        latest=rows == length - 1,
+        returns=exit_price / panel.close[rows, cols] - 1,
+    )
+
+
+# 分批準備的候選合併成一份
+def merge(parts):
+    parts = list(parts)
+    if not parts:
+        return prepare({})
+    return Candidates(*(np.concatenate(field) for field in zip(*parts)))
+
+
+# 一次評估整個 vol_mult × min_days 網格，條件與 screener.signal_mask 相同
+# 回傳以 vol_mult 為列、min_days 為欄的表：今日符合檔數、歷史訊號次數、平均報酬、勝率
+def sweep(candidates, vol_mults, min_days_list):
+    vm = np.asarray(vol_mults, dtype=float)[:, None, None]
+    md = np.maximum(np.asarray(min_days_list), 2)[None, :, None]
+    ok = (candidates.volume > vm * candidates.ma5vol) & (candidates.seen >= md)
+
+    has_return = ~np.isnan(candidates.returns)
+    counted = ok & has_return
+    n = counted.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(counted, candidates.returns, 0.0).sum(axis=-1) / n
+        win = (counted & (candidates.returns > 0)).sum(axis=-1) / n
+
+    index = pd.Index(vol_mults, name="爆量倍率")
+    columns = pd.Index(min_days_list, name="最低天數")
+    return {
+        "今日符合檔數": pd.DataFrame((ok & candidates.latest).sum(axis=-1), index, columns),
+        "歷史訊號次數": pd.DataFrame(ok.sum(axis=-1), index, columns),
+        "平均報酬": pd.DataFrame(mean, index, columns),
+        "勝率": pd.DataFrame(win, index, columns),
+    }
@@ -0,0 +1,105 @@
+import argparse
+import os
+import threading
+
+import pandas as pd
+
+# 離線股票主檔：股票代碼（索引）、公司名稱、市場別、產業別、交易單位
+# 平常只讀本地 parquet，需要更新時執行：python symbol_master.py refresh
+MASTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data_store", "symbol_master.parquet")
+
+# 證交所 ISIN 公開資料：strMode=2 上市、strMode=4 上櫃
+ISIN_URLS = {
+    "上市": "https://isin.twse.com.tw/isin/C_public.jsp?strMode=2",
+    "上櫃": "https://isin.twse.com.tw/isin/C_public.jsp?strMode=4",
+}
+
+# ISO 10962 分類碼：普通股（有表決權、無限制、已繳足、記名）
+COMMON_STOCK_CFI = "ESVUFR"
+
+# 台股一張 = 1000 股
+LOT_SIZE = 1000
+
+COLUMNS = ["公司名稱", "市場別", "產業別", "交易單位"]
+
+_lock = threading.Lock()
+_master = None
+
+
+# 沒有主檔時退回專案附的 tw_stocks.csv（只有代碼與名稱）
+def _from_csv():
+    try:
+        df = pd.read_csv("tw_stocks.csv", dtype=str)
+    except Exception:
+        return pd.DataFrame(columns=COLUMNS, index=pd.Index([], name="股票代碼"))
+    df = df.set_index("股票代碼")
+    df["市場別"] = df.get("市場別")
+    df["產業別"] = df.get("產業別")
+    df["交易單位"] = LOT_SIZE
+    return df[COLUMNS]
+
+
+def load():
+    global _master
+    with _lock:
+        if _master is None:
+            if os.path.exists(MASTER_PATH):
+                _master = pd.read_parquet(MASTER_PATH)
+            else:
+                _master = _from_csv()
+        return _master
+
+
+def get_name(code, default="未知公司"):
+    master = load()
+    if code in master.index:
+        return master.at[code, "公司名稱"]
+    return default
+
+
+def names():
+    return load()["公司名稱"].to_dict()
+
+
+# ISIN 清單的一個表格整理成主檔格式；只留普通股（CFICode 為 ESVUFR），
+# 權證、ETF、ETN、TDR、受益證券等其他有價證券與分類標題列一律丟掉
+def _parse_isin(table, market):
+    table = table[table["CFICode"].astype(str).str.strip() == COMMON_STOCK_CFI]
+    # 「有價證券代號及名稱」欄是「代號　名稱」，中間是全形空白
+    parts = table["有價證券代號及名稱"].astype(str).str.split("　", n=1)
+    df = pd.DataFrame({
+        "股票代碼": parts.str[0].str.strip(),
+        "公司名稱": parts.str[1].str.strip(),
+        "市場別": market,
+        "產業別": table["產業別"],
+        "交易單位": LOT_SIZE,
+    }).dropna(subset=["公司名稱"])
+    return df.set_index("股票代碼")
+
+
+def _download_isin(market, url):
+    return _parse_isin(pd.read_html(url, encoding="cp950", header=0)[0], market)
+
+
+# 從證交所下載最新的上市、上櫃清單，並補上 tw_stocks.csv 中自訂的名稱
+def refresh():
+    global _master
+    master = pd.concat([_download_isin(market, url) for market, url in ISIN_URLS.items()])
+    master = master[~master.index.duplicated(keep="first")]
+    custom = _from_csv()
+    master = pd.concat([master, custom[~custom.index.isin(master.index)]])
+    master["交易單位"] = master["交易單位"].astype("int64")
+    os.makedirs(os.path.dirname(MASTER_PATH), exist_ok=True)
+    master.to_parquet(MASTER_PATH)
+    with _lock:
+        _master = master
+    return master
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="台股離線股票主檔")
+    parser.add_argument("command", choices=["refresh"], help="refresh：重新下載上市櫃清單")
+    args = parser.parse_args()
+    if args.command == "refresh":
+        master = refresh()
+        print(f"已更新 {len(master)} 檔：{MASTER_PATH}")
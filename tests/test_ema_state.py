@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ema_state
+
+
+@pytest.fixture(autouse=True)
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ema_state, "STATE_DIR", str(tmp_path))
+
+
+def _frame(n, start=100.0):
+    index = pd.date_range("2024-01-01", periods=n, freq="B", tz="Asia/Taipei")
+    return pd.DataFrame({"Close": start + np.arange(n, dtype=float)}, index=index)
+
+
+def test_advance_matches_pandas():
+    data = _frame(50)
+    state = ema_state.EMAState((6, 30))
+    _, value = state.advance("2330.TW", data)
+    expected = [data["Close"].ewm(span=span).mean().iloc[-1] for span in (6, 30)]
+    assert np.allclose(value, expected)
+
+
+# 兩個工作階段各自讀檔、各算各的股票後存檔，不會互相蓋掉
+def test_save_merges_other_sessions():
+    first = ema_state.load((6, 30))
+    second = ema_state.load((6, 30))
+    first.advance("2330.TW", _frame(40))
+    second.advance("2317.TW", _frame(40, 50.0))
+    first.save()
+    second.save()
+    saved = ema_state.load((6, 30))
+    assert sorted(saved.symbols) == ["2317.TW", "2330.TW"]
+    assert np.allclose(saved.value("2330.TW"), first.value("2330.TW"))
+
+
+def test_save_keeps_newer_bars():
+    newer = ema_state.load((6, 30))
+    newer.advance("2330.TW", _frame(41))
+    newer.save()
+    older = ema_state.load((6, 30))
+    older.seed("2330.TW", ema_state._epoch(_frame(40).index), _frame(40)["Close"])
+    older.save()
+    assert np.allclose(ema_state.load((6, 30)).value("2330.TW"), newer.value("2330.TW"))
+
+
+def test_concurrent_saves():
+    errors = []
+
+    def session(i):
+        try:
+            state = ema_state.load((6, 30))
+            state.advance(f"{1000 + i}.TW", _frame(30))
+            state.save()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(ema_state.load((6, 30)).symbols) == 8
+
+
+# 除息後 Yahoo 把之前的K棒重新還原：存下的狀態要以新資料重建，而不是接在舊價格後面
+def test_advance_reseeds_after_adjustment():
+    data = _frame(40)
+    state = ema_state.load((6, 30))
+    state.advance("2330.TW", data)
+    state.save()
+
+    adjusted = _frame(41)
+    adjusted.iloc[:40] *= 0.97
+    _, value = ema_state.load((6, 30)).advance("2330.TW", adjusted)
+    expected = [adjusted["Close"].ewm(span=span).mean().iloc[-1] for span in (6, 30)]
+    assert np.allclose(value, expected)
+
+
+def test_advance_replaces_partial_last_bar():
+    data = _frame(40)
+    state = ema_state.EMAState((6, 30))
+    state.advance("2330.TW", data)
+    updated = data.copy()
+    updated.iloc[-1] += 2.0
+    _, value = state.advance("2330.TW", updated)
+    expected = [updated["Close"].ewm(span=span).mean().iloc[-1] for span in (6, 30)]
+    assert np.allclose(value, expected)
@@ -0,0 +1,17 @@
+import fetch_plan
+
+
+def _days(period):
+    return int(period.rstrip("d"))
+
+
+def test_plan_covers_min_bars():
+    warmup_only = fetch_plan.plan("1d", 1, spans=(6, 30), windows=(5,))
+    with_min_days = fetch_plan.plan("1d", 1, spans=(6, 30), windows=(5,), min_bars=90)
+    assert _days(with_min_days) > _days(warmup_only)
+    # 扣掉週末仍要有 90 根以上
+    assert _days(with_min_days) * 5 / 7 >= 90
+
+
+def test_plan_min_bars_below_warmup():
+    assert fetch_plan.plan("1d", 1, spans=(6, 30), min_bars=10) == fetch_plan.plan("1d", 1, spans=(6, 30))
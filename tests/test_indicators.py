@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+
+SPANS = (6, 12, 30, 60, 90, 180)
+
+
+def _series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.standard_normal(n))
+
+
+def _pandas_ema(values, spans):
+    return np.stack([pd.Series(values).ewm(span=span, adjust=True).mean().to_numpy() for span in spans], axis=-1)
+
+
+def test_ema_matrix_matches_pandas():
+    values = _series(500)
+    values[:20] = np.nan
+    values[100:105] = np.nan
+    values[300:] = values[300]
+    assert np.array_equal(indicators.ema_matrix(values, SPANS), _pandas_ema(values, SPANS), equal_nan=True)
+
+
+def test_ema_matrix_panel_matches_columns():
+    panel = np.stack([_series(300, seed) for seed in range(5)], axis=1)
+    panel[:40, 2] = np.nan
+    out = indicators.ema_matrix(panel, (6, 30))
+    assert out.shape == (300, 5, 2)
+    for j in range(5):
+        assert np.array_equal(out[:, j], _pandas_ema(panel[:, j], (6, 30)), equal_nan=True)
+
+
+def test_ema_matrix_empty():
+    assert indicators.ema_matrix(np.empty(0), (6, 30)).shape == (0, 2)
+    assert indicators.ema_matrix(np.empty((0, 3)), (6,)).shape == (0, 3, 1)
+
+
+# 面板夠寬時走單次推進：前段缺資料、中間缺漏、價格不變、全空的股票都要與 pandas 相同
+def test_ema_matrix_fused_panel_matches_pandas():
+    count = indicators.FUSED_MIN_COLUMNS // 2
+    panel = np.stack([_series(200, seed) for seed in range(count)], axis=1)
+    rng = np.random.default_rng(1)
+    for j in range(0, count, 3):
+        panel[:rng.integers(0, 190), j] = np.nan
+    panel[50:55, 1] = np.nan
+    panel[-1, 4] = np.nan
+    panel[100:, 7] = panel[100, 7]
+    panel[:, 10] = np.nan
+    panel[:, 13] = 0.0
+    out = indicators.ema_matrix(panel, (6, 30))
+    for j in range(count):
+        assert np.array_equal(out[:, j], _pandas_ema(panel[:, j], (6, 30)), equal_nan=True), j
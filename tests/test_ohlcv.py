@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ohlcv import OHLCV, Bar
+
+
+def _bars(n=5):
+    index = pd.date_range("2024-01-01", periods=n, freq="B", tz="Asia/Taipei")
+    close = np.arange(100, 100 + n, dtype=float)
+    frame = pd.DataFrame({"Open": close - 1, "High": close + 1, "Low": close - 2, "Close": close,
+                          "Volume": np.arange(n) * 1000}, index=index)
+    return frame, OHLCV.from_frame(frame)
+
+
+def test_integer_key_returns_bar():
+    frame, bars = _bars()
+    last = bars[-1]
+    assert isinstance(last, Bar)
+    assert last.close == 104.0 and last.volume == 4000
+    assert last.ts == frame.index[-1].timestamp()
+    assert bars[np.int64(0)].open == 99.0
+    with pytest.raises(IndexError):
+        bars[5]
+
+
+def test_slice_returns_view():
+    _, bars = _bars()
+    tail = bars[-3:]
+    assert isinstance(tail, OHLCV) and len(tail) == 3
+    assert np.shares_memory(tail.close, bars.close)
+    assert len(bars[bars.close > 102]) == 2
+
+
+def test_column_key_raises_type_error():
+    _, bars = _bars()
+    with pytest.raises(TypeError):
+        bars["Close"]
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import price_store
+
+
+def _bars(days, close, dividends=0.0):
+    index = pd.DatetimeIndex(days, tz="Asia/Taipei", name="Date")
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close,
+                         "Volume": np.full(len(close), 1000), "Dividends": dividends,
+                         "Stock Splits": 0.0}, index=index)
+
+
+# 不連網：以固定資料代替 yfinance；calls 記錄每次下載的參數
+class FakeTicker:
+    calls = []
+    full = None
+    tail = None
+
+    def __init__(self, symbol):
+        pass
+
+    def history(self, interval, **kwargs):
+        FakeTicker.calls.append(kwargs)
+        return FakeTicker.tail if "start" in kwargs else FakeTicker.full
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(price_store.yf, "Ticker", FakeTicker)
+    FakeTicker.calls = []
+    days = pd.bdate_range(end=pd.Timestamp.now().normalize() - pd.Timedelta(days=1), periods=10)
+    # 快取裡是除息前還原的價格，且已經過期
+    price_store.save("2330.TW", "1d", _bars(days, np.full(10, 100.0)), "max")
+    stale = pd.Timestamp.now().timestamp() - 3600
+    os.utime(price_store._path("2330.TW", "1d"), (stale, stale))
+    return days
+
+
+def test_tail_without_actions_is_appended(store):
+    FakeTicker.tail = _bars(store[-1:].append(store[-1:] + pd.offsets.BDay()), [100.0, 101.0])
+    data = price_store.get_history("2330.TW", "max")
+    assert len(FakeTicker.calls) == 1
+    assert list(data["Close"]) == [100.0] * 10 + [101.0]
+    assert list(data.columns) == price_store.COLUMNS
+
+
+# 補抓的一段有除息：舊K棒要重新還原，整段重新下載而不是接在舊資料後面
+def test_tail_with_dividend_reloads_partition(store):
+    ex_date = store[-1] + pd.offsets.BDay()
+    FakeTicker.tail = _bars([store[-1], ex_date], [100.0, 97.0], dividends=[0.0, 3.0])
+    FakeTicker.full = _bars(store.append(pd.DatetimeIndex([ex_date])), [97.0] * 10 + [97.0])
+    data = price_store.get_history("2330.TW", "max")
+    assert [("start" in call) for call in FakeTicker.calls] == [True, False]
+    assert list(data["Close"]) == [97.0] * 11
+    assert list(price_store.load("2330.TW", "1d")["Close"]) == [97.0] * 11
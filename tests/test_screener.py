@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+import screener
+
+COLUMNS = ["代碼", "收盤", "成交量"]
+
+
+def _frame(close, volume):
+    index = pd.date_range("2024-01-01", periods=len(close), freq="B")
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": volume}, index=index)
+
+
+def test_screen_frames_without_frames():
+    table = screener.screen_frames({}, 2.0, 7)
+    assert table.empty
+    assert list(table.columns) == COLUMNS
+
+
+def test_screen_frames_all_fetches_empty():
+    table = screener.screen_frames({"2330": _frame([], [])}, 2.0, 7)
+    assert table.empty
+    assert list(table.columns) == COLUMNS
+    assert screener.screen_hits({"2330": _frame([], [])}, 2.0, 7).series == {}
+
+
+# 跌了一段後放量急拉：最後一根 EMA6 上穿 EMA30 且爆量收紅
+def test_screen_frames_hit():
+    close = np.r_[np.linspace(120, 100, 40), 130.0]
+    volume = np.r_[np.full(40, 1000), 10000]
+    table = screener.screen_frames({"2330": _frame(close, volume), "2317": _frame(np.full(41, 50.0), volume)}, 2.0, 7)
+    assert list(table["代碼"]) == ["2330"]
+    assert table["收盤"].iloc[0] == 130.0
+    assert table["成交量"].iloc[0] == 10000
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+import indicators
+import screener
+import streaming_screener
+
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    close = np.r_[np.linspace(120, 100, n - 1) + rng.standard_normal(n - 1) * 0.1, 130.0]
+    volume = np.r_[np.full(n - 1, 1000), 10000]
+    index = pd.date_range("2024-01-01", periods=n, freq="B", tz="Asia/Taipei")
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": volume}, index=index)
+
+
+# 不連網：以固定資料代替 bulk_download.iter_chunks
+def _stream(monkeypatch, frames):
+    def fake_chunks(tickers, period, interval, chunk_size):
+        yield tickers, {ticker: frames[ticker.split(".")[0]] for ticker in tickers}
+    monkeypatch.setattr(streaming_screener, "iter_chunks", fake_chunks)
+    return streaming_screener.stream([f"{code}.TW" for code in frames])
+
+
+# 命中股保留的K棒含 EMA30 暖機：圖上的 EMA30 與篩選時用全部資料算出的相同
+def test_chart_bars_cover_ema_warmup(monkeypatch):
+    frames = {"2330": _frame(90, 0), "2317": _frame(300, 1)}
+    summary, charts = _stream(monkeypatch, frames)
+    assert set(charts) == {"2330", "2317"}
+    for code, frame in frames.items():
+        bars = charts[code]
+        assert len(bars) == min(len(frame), streaming_screener.CHART_BARS)
+        full = indicators.ema(frame["Close"].to_numpy(), 30)[-1]
+        drawn = indicators.ema(bars.close, 30)[-1]
+        assert abs(drawn - full) < 1e-3 * full
+
+
+def test_stream_matches_screen_frames(monkeypatch):
+    frames = {"2330": _frame(90, 0), "2317": _frame(300, 1)}
+    summary, _ = _stream(monkeypatch, frames)
+    table = streaming_screener.hit_table(summary, streaming_screener.verdict(summary, 2.0, 30))
+    expected = screener.screen_frames(frames, 2.0, 30)
+    assert sorted(table["代碼"]) == sorted(expected["代碼"])
@@ -0,0 +1,34 @@
+import pandas as pd
+
+import symbol_master
+
+HEADER = ["有價證券代號及名稱", "國際證券辨識號碼(ISIN Code)", "上市日", "市場別", "產業別", "CFICode", "備註"]
+
+
+# 與 pd.read_html 讀到的 ISIN 清單同格式：分類標題列每欄都是標題文字
+def _table(rows):
+    return pd.DataFrame(rows, columns=HEADER)
+
+
+def test_parse_isin_keeps_only_common_stock():
+    table = _table([
+        ["股票"] * 7,
+        ["2330　台積電", "TW0002330008", "1994/09/05", "上市", "半導體業", "ESVUFR", None],
+        ["1101　台泥", "TW0001101004", "1962/02/09", "上市", "水泥工業", "ESVUFR", None],
+        ["上市認購(售)權證"] * 7,
+        ["030001　台積電元大5A購01", "TW18Z0300018", "2025/01/02", "上市", None, "RWSCCA", None],
+        ["ETF"] * 7,
+        ["0050　元大台灣50", "TW0000050004", "2003/06/30", "上市", None, "CEOGEU", None],
+        ["臺灣存託憑證(TDR)"] * 7,
+        ["9103　美德醫療-DR", "TW0009103000", "2009/11/19", "上市", None, "EDSDDR", None],
+    ])
+    master = symbol_master._parse_isin(table, "上市")
+    assert list(master.index) == ["2330", "1101"]
+    assert master.at["2330", "公司名稱"] == "台積電"
+    assert master.at["2330", "產業別"] == "半導體業"
+    assert (master["市場別"] == "上市").all()
+
+
+def test_parse_isin_without_common_stock():
+    table = _table([["030001　台積電元大5A購01", "TW18Z0300018", "2025/01/02", "上市", None, "RWSCCA", None]])
+    assert symbol_master._parse_isin(table, "上市").empty
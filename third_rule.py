@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+# 台股升降單位：價格 <10、<50、<100、<500、<1000、>=1000
+TICK_BOUNDS = np.array([10, 50, 100, 500, 1000])
+TICK_SIZES = np.array([0.01, 0.05, 0.1, 0.5, 1, 5])
+
+# 檔位順序：往上 10%、7%、2/3、1/3，往下 1/3、2/3、7%、10%（以基礎數值的倍數表示）
+LEVEL_NAMES = ["往上10%", "往上7%", "往上2/3", "往上1/3", "往下1/3", "往下2/3", "往下7%", "往下10%"]
+LEVEL_STEPS = np.array([4, 3, 2, 1, -1, -2, -3, -4])
+
+
+def tick_size(prices):
+    return TICK_SIZES[np.searchsorted(TICK_BOUNDS, prices, side="right")]
+
+
+# 價格對齊到該價位的升降單位
+def snap_to_tick(prices):
+    prices = np.asarray(prices, dtype=float)
+    ticks = tick_size(prices)
+    return np.round(np.round(prices / ticks) * ticks, 2)
+
+
+# 三分之一法：基礎數值 = round(價格 × 7% / 3)，各檔位 = 價格 ± n × 基礎數值，再對齊升降單位
+# prices 可為單一價格或陣列；回傳 (基礎數值, 檔位)，檔位最後一維依 LEVEL_NAMES 排列
+def third_rule_levels(prices):
+    prices = np.asarray(prices, dtype=float)
+    base = np.round(prices * 0.07 / 3)
+    levels = snap_to_tick(prices[..., None] + LEVEL_STEPS * base[..., None])
+    return base, levels
+
+
+# 整個市場一次算好：傳入以股票代碼為索引的參考價，回傳每檔一列的檔位表
+def levels_frame(prices):
+    base, levels = third_rule_levels(prices.to_numpy(dtype=float))
+    table = pd.DataFrame(levels, index=prices.index, columns=LEVEL_NAMES)
+    table.insert(0, "基礎數值", base)
+    table.insert(0, "參考價", prices.to_numpy(dtype=float))
+    return table
@@ -1,50 +1,52 @@
 import streamlit as st
-import yfinance as yf
-import pandas as pd
 import mplfinance as mpf
 import matplotlib.pyplot as plt
 from datetime import datetime
 
+import chart_cache
+import fetch_plan
+import indicators
+import market_index
+import third_rule
+import price_store
+import symbol_master
+
 st.set_page_config(page_title="三分之一法股價分析工具", layout="wide")
 
 st.title("📈 三分之一法股價分析工具")
 
+# 圖上畫的 EMA 與顯示的K棒數；下載量依最長的 EMA 暖機需求決定
+SPANS = [6, 12, 30, 60, 90, 180]
+VISIBLE_BARS = 5
+# 圖的樣式有改動時換掉這個版本字串，舊的快取圖就不會再被使用
+CHART_STYLE = "yahoo-red-green-v1"
+
 # 股票代碼輸入
 stock_id = st.text_input("請輸入台股股票代碼（如 2330）:")
 
-# 讀取股票對照表（若有）
-@st.cache_data
-def load_stock_map():
-    try:
-        df = pd.read_csv("tw_stocks.csv", dtype=str)
-        return dict(zip(df["股票代碼"], df["公司名稱"]))
-    except:
-        return {}
-
-stock_name_map = load_stock_map()
-
 # 計算三分之一法
 def calculate_third_rule(price):
-    base = round(price * 0.07 / 3)
+    base, levels = third_rule.third_rule_levels(price)
+    up_10, up_7, up_2_3, up_1_3, down_1_3, down_2_3, down_7, down_10 = levels.tolist()
     result = {
         "目前股價 💰": price,
-        "基礎數值（四捨五入）": base,
-        "⬆ 往上 10%": round(price + 4 * base, 1),
-        "⬆ 往上 7%": round(price + 3 * base, 1),
-        "⬆ 往上 2/3": round(price + 2 * base, 1),
-        "⬆ 往上 1/3": round(price + 1 * base, 1),
+        "基礎數值（四捨五入）": int(base),
+        "⬆ 往上 10%": up_10,
+        "⬆ 往上 7%": up_7,
+        "⬆ 往上 2/3": up_2_3,
+        "⬆ 往上 1/3": up_1_3,
         "────────────": "────────────",
-        "⬇ 往下 1/3": round(price - 1 * base, 1),
-        "⬇ 往下 2/3": round(price - 2 * base, 1),
-        "⬇ 往下 7%": round(price - 3 * base, 1),
-        "⬇ 往下 10%": round(price - 4 * base, 1),
+        "⬇ 往下 1/3": down_1_3,
+        "⬇ 往下 2/3": down_2_3,
+        "⬇ 往下 7%": down_7,
+        "⬇ 往下 10%": down_10,
     }
     return result
 
 # 計算均線
 def add_ema(data, spans):
-    for span in spans:
-        data[f"EMA{span}"] = data["Close"].ewm(span=span).mean()
+    emas = indicators.ema_matrix(data["Close"].to_numpy(dtype=float), spans)
+    data[[f"EMA{span}" for span in spans]] = emas
     return data
 
 # 計算近三日均價
@@ -60,20 +62,18 @@ def calculate_recent_average(data):
 # 下載股價
 @st.cache_data
 def fetch_data(stock_code):
-    ticker = yf.Ticker(f"{stock_code}.TW")
-    data = ticker.history(period="7d", interval="1d")
-    if data.empty:
-        ticker = yf.Ticker(f"{stock_code}.TWO")
-        data = ticker.history(period="7d", interval="1d")
-    name = stock_name_map.get(stock_code, ticker.info.get("shortName", "未知公司"))
+    symbol, data = market_index.fetch_with_fallback(
+        stock_code, lambda s: price_store.get_history(s, fetch_plan.plan("1d", VISIBLE_BARS, SPANS), "1d"))
+    name = symbol_master.get_name(stock_code)
     return data, name
 
 # 畫圖
 def plot_chart(data):
-    spans = [6, 12, 30, 60, 90, 180]
+    spans = SPANS
     colors = ["orange", "cyan", "purple", "limegreen", "pink", "blue"]
     labels = [f"EMA{span}" for span in spans]
-    data = add_ema(data, spans)
+    # EMA 用完整的暖機資料計算，畫圖只取最後幾根
+    data = add_ema(data, spans).iloc[-VISIBLE_BARS:]
 
     apds = [mpf.make_addplot(data[f"EMA{span}"], color=colors[i], panel=0, label=labels[i]) for i, span in enumerate(spans)]
 
@@ -95,10 +95,10 @@ def plot_chart(data):
         returnfig=True
     )
 
-    # 顯示每條 EMA 的最新值
+    # 顯示每條 EMA 的最新值；mplfinance 的 x 軸是K棒序號，不是日期
     for i, span in enumerate(spans):
         value = round(data[f"EMA{span}"].iloc[-1], 2)
-        axes[0].text(data.index[-1], data[f"EMA{span}"].iloc[-1], f"{labels[i]}: {value}", fontsize=8, color=colors[i], ha='left')
+        axes[0].text(len(data) - 1, data[f"EMA{span}"].iloc[-1], f"{labels[i]}: {value}", fontsize=8, color=colors[i], ha='left')
 
     return fig
 
@@ -129,7 +129,9 @@ if stock_id:
                 st.markdown(f"- {d}：{v}")
 
             st.markdown("---")
-            st.pyplot(plot_chart(data))
+            key = chart_cache.make_key(stock_id, "1d", chart_cache.last_bar(data), CHART_STYLE,
+                                       SPANS + [VISIBLE_BARS])
+            st.image(chart_cache.render(key, lambda: plot_chart(data)), width="stretch")
 
         else:
             st.warning("找不到資料，請檢查代碼是否正確或暫無資料。")
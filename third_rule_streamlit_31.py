@@ -1,10 +1,16 @@
 # streamlit_app.py
 import streamlit as st
 import yfinance as yf
+import numpy as np
 import pandas as pd
 import mplfinance as mpf
 import matplotlib.pyplot as plt
 
+import indicators
+import market_index
+import third_rule
+import symbol_master
+
 # 設定樣式
 st.set_page_config(page_title="三分之一法股價工具", layout="wide")
 st.title("📈 三分之一法股價分析工具")
@@ -15,25 +21,26 @@ stock_id = st.text_input("請輸入股票代碼（如 2330）")
 # 計算三分之一法
 @st.cache_data
 def calculate_third_rule(price):
-    base = round(price * 0.07 / 3)
+    base, levels = third_rule.third_rule_levels(price)
+    up_10, up_7, up_2_3, up_1_3, down_1_3, down_2_3, down_7, down_10 = levels.tolist()
     return {
         "目前股價 💰": price,
-        "基礎數值（四捨五入）": base,
-        "<div style="color:red;">⬆ 往上 10%": round(price + 4 * base, 1),
-        "⬆ 往上 7%": round(price + 3 * base, 1),
-        "⬆ 往上 2/3": round(price + 2 * base, 1),
-        "⬆ 往上 1/3": round(price + base, 1),
-        "<div style="color:green;">⬇ 往下 1/3": round(price - base, 1),
-        "⬇ 往下 2/3": round(price - 2 * base, 1),
-        "⬇ 往下 7%": round(price - 3 * base, 1),
-        "⬇ 往下 10%": round(price - 4 * base, 1),
+        "基礎數值（四捨五入）": int(base),
+        "<div style="color:red;">⬆ 往上 10%": up_10,
+        "⬆ 往上 7%": up_7,
+        "⬆ 往上 2/3": up_2_3,
+        "⬆ 往上 1/3": up_1_3,
+        "<div style="color:green;">⬇ 往下 1/3": down_1_3,
+        "⬇ 往下 2/3": down_2_3,
+        "⬇ 往下 7%": down_7,
+        "⬇ 往下 10%": down_10,
     }
 
 # 加入 EMA 計算
 @st.cache_data
 def add_ema(data, spans):
-    for span in spans:
-        data[f"EMA{span}"] = data['Close'].ewm(span=span).mean()
+    emas = indicators.ema_matrix(data['Close'].to_numpy(dtype=float), spans)
+    data[[f"EMA{span}" for span in spans]] = emas
     return data
 
 # 三日均價
@@ -47,12 +54,10 @@ def calculate_recent_avg(data):
 
 # 判斷金叉死叉
 def detect_crossovers(data):
+    golden, death = indicators.cross_masks(data['EMA6'], data['EMA30'])
     events = []
-    for i in range(1, len(data)):
-        if data['EMA6'].iloc[i-1] < data['EMA30'].iloc[i-1] and data['EMA6'].iloc[i] > data['EMA30'].iloc[i]:
-            events.append((data.index[i], data['Close'].iloc[i], '金叉'))
-        elif data['EMA6'].iloc[i-1] > data['EMA30'].iloc[i-1] and data['EMA6'].iloc[i] < data['EMA30'].iloc[i]:
-            events.append((data.index[i], data['Close'].iloc[i], '死叉'))
+    for i in np.flatnonzero(golden | death):
+        events.append((data.index[i], data['Close'].iloc[i], '金叉' if golden[i] else '死叉'))
     return events
 
 # 畫圖
@@ -84,12 +89,9 @@ def plot_chart(data, spans):
 # 主邏輯
 if stock_id:
     try:
-        ticker = yf.Ticker(f"{stock_id}.TW")
-        daily = ticker.history(period="7d", interval="1d")
-        if daily.empty:
-            ticker = yf.Ticker(f"{stock_id}.TWO")
-            daily = ticker.history(period="7d", interval="1d")
-        name = ticker.info.get("shortName", "未知公司")
+        symbol, daily = market_index.fetch_with_fallback(
+            stock_id, lambda s: yf.Ticker(s).history(period="7d", interval="1d"))
+        name = symbol_master.get_name(stock_id)
 
         st.subheader(f"📊 {stock_id} - {name} 最新分析")
         price = round(daily['Close'].iloc[-1], 1)
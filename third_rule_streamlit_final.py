@@ -4,6 +4,10 @@ import pandas as pd
 import mplfinance as mpf
 import matplotlib.pyplot as plt
 
+import market_index
+import third_rule
+import symbol_master
+
 # 頁面設定
 st.set_page_config(page_title="三分之一法股價分析工具", layout="wide")
 st.title("📈 三分之一法股價分析工具")
@@ -13,19 +17,19 @@ stock_symbol = st.text_input("請輸入股票代碼（如 2330 ）", value="2330
 
 if stock_symbol:
     stock_symbol = stock_symbol.strip()
-    ticker_symbol = f"{stock_symbol}.TW"
+    ticker_symbol = market_index.symbol_for(stock_symbol)
     ticker = yf.Ticker(ticker_symbol)
     hist = ticker.history(period="90d")
 
     if hist.empty:
         st.error("找不到此股票資料，請確認代碼正確。")
     else:
-        stock_info = ticker.info
-        stock_name = stock_info.get("longName", "N/A").upper()
+        stock_name = symbol_master.get_name(stock_symbol, "N/A")
 
         # 取得最新股價與均線
         price = hist["Close"].iloc[-1]
-        base = round(price * 0.07 / 3)
+        base, levels = third_rule.third_rule_levels(price)
+        base = int(base)
         avg_price_today = round((hist["High"].iloc[-1] + hist["Low"].iloc[-1] + hist["Close"].iloc[-1]) / 3, 1)
         avg_1d = round((hist["High"].iloc[-2] + hist["Low"].iloc[-2] + hist["Close"].iloc[-2]) / 3, 1)
         avg_2d = round((hist["High"].iloc[-3] + hist["Low"].iloc[-3] + hist["Close"].iloc[-3]) / 3, 1)
@@ -34,15 +38,7 @@ if stock_symbol:
         st.subheader(f"📊 {stock_symbol} - {stock_name} 最新分析")
 
         # 計算目標區間
-        up_10 = round(price + 4 * base, 1)
-        up_7 = round(price + 3 * base, 1)
-        up_2_3 = round(price + 2 * base, 1)
-        up_1_3 = round(price + base, 1)
-
-        down_1_3 = round(price - base, 1)
-        down_2_3 = round(price - 2 * base, 1)
-        down_7 = round(price - 3 * base, 1)
-        down_10 = round(price - 4 * base, 1)
+        up_10, up_7, up_2_3, up_1_3, down_1_3, down_2_3, down_7, down_10 = levels.tolist()
 
         col1, col2 = st.columns(2)
         with col1:
@@ -4,6 +4,10 @@ import yfinance as yf
 import pandas as pd
 import matplotlib.pyplot as plt
 
+import market_index
+import third_rule
+import symbol_master
+
 # 標題
 st.title("📊 三分之一法股價分析工具")
 
@@ -12,31 +16,28 @@ stock_code = st.text_input("請輸入台股股票代碼（如 2330）")
 
 # 計算三分之一法邏輯
 def calculate_third_rule(price):
-    base = round(price * 0.07 / 3)
+    base, levels = third_rule.third_rule_levels(price)
+    up_10, up_7, up_2_3, up_1_3, down_1_3, down_2_3, down_7, down_10 = levels.tolist()
     return {
         "目前股價 💰": price,
-        "基礎數值（四捨五入）": base,
-        "⬆ 往上 10%": round(price + 4 * base, 1),
-        "⬆ 往上 7%": round(price + 3 * base, 1),
-        "⬆ 往上 2/3": round(price + 2 * base, 1),
-        "⬆ 往上 1/3": round(price + base, 1),
+        "基礎數值（四捨五入）": int(base),
+        "⬆ 往上 10%": up_10,
+        "⬆ 往上 7%": up_7,
+        "⬆ 往上 2/3": up_2_3,
+        "⬆ 往上 1/3": up_1_3,
         "────────────": "────────────",
-        "⬇ 往下 1/3": round(price - base, 1),
-        "⬇ 往下 2/3": round(price - 2 * base, 1),
-        "⬇ 往下 7%": round(price - 3 * base, 1),
-        "⬇ 往下 10%": round(price - 4 * base, 1)
+        "⬇ 往下 1/3": down_1_3,
+        "⬇ 往下 2/3": down_2_3,
+        "⬇ 往下 7%": down_7,
+        "⬇ 往下 10%": down_10
     }
 
 # 畫面顯示邏輯
 if stock_code:
     try:
-        ticker = yf.Ticker(f"{stock_code}.TW")
-        hist = ticker.history(period="90d")
-        name = ticker.info.get("shortName", "未知公司")
-        if hist.empty:
-            ticker = yf.Ticker(f"{stock_code}.TWO")
-            hist = ticker.history(period="90d")
-            name = ticker.info.get("shortName", "未知公司")
+        symbol, hist = market_index.fetch_with_fallback(
+            stock_code, lambda s: yf.Ticker(s).history(period="90d"))
+        name = symbol_master.get_name(stock_code)
 
         if hist.empty:
             st.error("⚠️ 找不到此股票資料")
@@ -1,48 +1,49 @@
 
 import streamlit as st
 import yfinance as yf
+import numpy as np
 import pandas as pd
 import mplfinance as mpf
-import matplotlib.pyplot as plt
-from io import BytesIO
 import base64
 
+import chart_cache
+import indicators
+import market_index
+import third_rule
+import symbol_master
+
 def fetch_data(stock_id):
-    ticker = yf.Ticker(f"{stock_id}.TW")
-    hist = ticker.history(period="90d")
-    if hist.empty:
-        ticker = yf.Ticker(f"{stock_id}.TWO")
-        hist = ticker.history(period="90d")
-    return hist, ticker
+    symbol, hist = market_index.fetch_with_fallback(
+        stock_id, lambda s: yf.Ticker(s).history(period="90d"))
+    return hist, yf.Ticker(symbol)
 
 def calculate_third_rule(price):
-    base = round(price * 0.07 / 3)
+    base, levels = third_rule.third_rule_levels(price)
+    up_10, up_7, up_2_3, up_1_3, down_1_3, down_2_3, down_7, down_10 = levels.tolist()
     return {
         "目前股價": price,
-        "基礎數值（四捨五入）": base,
-        "⬆ 往上 10%": round(price + 4 * base, 1),
-        "⬆ 往上 7%": round(price + 3 * base, 1),
-        "⬆ 往上 2/3": round(price + 2 * base, 1),
-        "⬆ 往上 1/3": round(price + base, 1),
+        "基礎數值（四捨五入）": int(base),
+        "⬆ 往上 10%": up_10,
+        "⬆ 往上 7%": up_7,
+        "⬆ 往上 2/3": up_2_3,
+        "⬆ 往上 1/3": up_1_3,
         "────────────" : "────────────",
-        "⬇ 往下 1/3": round(price - base, 1),
-        "⬇ 往下 2/3": round(price - 2 * base, 1),
-        "⬇ 往下 7%": round(price - 3 * base, 1),
-        "⬇ 往下 10%": round(price - 4 * base, 1)
+        "⬇ 往下 1/3": down_1_3,
+        "⬇ 往下 2/3": down_2_3,
+        "⬇ 往下 7%": down_7,
+        "⬇ 往下 10%": down_10
     }
 
 def add_ema(df, spans):
-    for span in spans:
-        df[f"EMA{span}"] = df["Close"].ewm(span=span).mean()
+    emas = indicators.ema_matrix(df["Close"].to_numpy(dtype=float), spans)
+    df[[f"EMA{span}" for span in spans]] = emas
     return df
 
 def detect_crossovers(df):
+    golden, death = indicators.cross_masks(df["EMA6"], df["EMA30"])
     cross = []
-    for i in range(1, len(df)):
-        if df["EMA6"].iloc[i-1] < df["EMA30"].iloc[i-1] and df["EMA6"].iloc[i] > df["EMA30"].iloc[i]:
-            cross.append((df.index[i], df["Close"].iloc[i], "金叉"))
-        elif df["EMA6"].iloc[i-1] > df["EMA30"].iloc[i-1] and df["EMA6"].iloc[i] < df["EMA30"].iloc[i]:
-            cross.append((df.index[i], df["Close"].iloc[i], "死叉"))
+    for i in np.flatnonzero(golden | death):
+        cross.append((df.index[i], df["Close"].iloc[i], "金叉" if golden[i] else "死叉"))
     return cross
 
 def calculate_avg_prices(df):
@@ -53,7 +54,10 @@ def calculate_avg_prices(df):
         result.append((idx.strftime("%Y-%m-%d"), avg))
     return result
 
-def plot_k_chart(df):
+# 圖的樣式有改動時換掉這個版本字串，舊的快取圖就不會再被使用
+CHART_STYLE = "yahoo-red-green-annotated-v1"
+
+def draw_k_chart(df):
     spans = [6, 12, 30, 60, 90, 180]
     colors = ["orange", "cyan", "purple", "limegreen", "pink", "blue"]
     labels = [f"EMA{s}" for s in spans]
@@ -68,21 +72,24 @@ def plot_k_chart(df):
     fig, axes = mpf.plot(df, type='candle', style=style, addplot=apds, volume=True, returnfig=True,
                          figscale=1.3, title="日K圖與EMA均線")
 
+    # mplfinance 的 x 軸是K棒序號，不是日期
     for i, span in enumerate(spans):
         value = round(df[f"EMA{span}"].iloc[-1], 2)
-        axes[0].text(df.index[-1], df[f"EMA{span}"].iloc[-1], f"{labels[i]}: {value}",
+        axes[0].text(len(df) - 1, df[f"EMA{span}"].iloc[-1], f"{labels[i]}: {value}",
                      color=colors[i], fontsize=8, ha='left')
 
     for t, y, label in cross_alerts[-3:]:
-        axes[0].annotate(label, xy=(t, y), xytext=(t, y*1.03), fontsize=9,
+        x = df.index.get_loc(t)
+        axes[0].annotate(label, xy=(x, y), xytext=(x, y*1.03), fontsize=9,
                          bbox=dict(boxstyle="round", facecolor="white", edgecolor="red"),
                          arrowprops=dict(arrowstyle="->", color="red"))
 
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close()
+    return fig
+
+# 同一檔、同一根最新K棒只畫一次，之後直接用快取的 PNG
+def plot_k_chart(code, df):
+    key = chart_cache.make_key(code, "1d", chart_cache.last_bar(df), CHART_STYLE, [6, 12, 30, 60, 90, 180])
+    encoded = base64.b64encode(chart_cache.render(key, lambda: draw_k_chart(df))).decode("utf-8")
     return f"data:image/png;base64,{encoded}"
 
 # Streamlit 介面
@@ -104,7 +111,7 @@ if st.button("開始分析"):
                 rule_result = calculate_third_rule(price)
                 avg_prices = calculate_avg_prices(hist)
 
-                st.subheader(f"📊 計算結果：{stock_id} - {ticker.info.get('shortName', '未知公司')}")
+                st.subheader(f"📊 計算結果：{stock_id} - {symbol_master.get_name(stock_id)}")
                 for key, value in rule_result.items():
                     if "往上" in key:
                         st.markdown(f"<div style='background-color:#ffe6e6;padding:6px'>{key}: <b>{value}</b></div>", unsafe_allow_html=True)
@@ -120,5 +127,5 @@ if st.button("開始分析"):
                     st.markdown(f"- {d}：{v}")
 
                 st.markdown("📉 **日K + EMA 均線圖表**")
-                chart_url = plot_k_chart(hist)
+                chart_url = plot_k_chart(stock_id, hist)
                 st.markdown(f"![chart]({chart_url})", unsafe_allow_html=True)
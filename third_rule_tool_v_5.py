@@ -1,63 +1,77 @@
+import queue
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import messagebox, ttk
-import yfinance as yf
 import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
 import mplfinance as mpf
 
-# 從 CSV 載入股票代碼與公司名稱
-try:
-    stock_df = pd.read_csv("tw_stocks.csv", dtype=str)
-    custom_names = dict(zip(stock_df["股票代碼"], stock_df["公司名稱"]))
-except:
-    custom_names = {}
+import downsample
+import fetch_plan
+import indicators
+import market_index
+import third_rule
+import price_store
+import resample
+import symbol_master
+
+# 圖上畫的 EMA 與顯示的K棒數（日K 約一週、5 分K 約五天）；下載量依最長的 EMA 暖機需求決定
+SPANS = [6, 12, 30, 60, 90, 180]
+VISIBLE_DAILY = 5
+VISIBLE_INTRADAY = 5 * fetch_plan.BARS_PER_DAY["5m"]
+# 下載與計算在背景執行緒進行，結果放進佇列，由主執行緒每 POLL_MS 毫秒取回後更新畫面
+POLL_MS = 100
+
+_executor = ThreadPoolExecutor(max_workers=2)
+_results = queue.Queue()
+# 每次查詢的序號；回來的結果不是最新一次查詢的就丟掉
+_latest = 0
+_pending = None
+# 目前顯示中的圖，新結果畫好前不關閉
+_figures = []
 
 def get_stock_data(stock_code):
     try:
-        ticker = yf.Ticker(f"{stock_code}.TW")
-        daily_data = ticker.history(period="7d", interval="1d")
-        intraday_data = ticker.history(period="5d", interval="5m")
-        info = ticker.info
-        if daily_data.empty:
-            ticker = yf.Ticker(f"{stock_code}.TWO")
-            daily_data = ticker.history(period="7d", interval="1d")
-            intraday_data = ticker.history(period="5d", interval="5m")
-            info = ticker.info
-        name = custom_names.get(stock_code, info.get("shortName", "未知公司"))
+        # 只抓 5 分K，近幾天的日K 由 5 分K 合成
+        symbol, intraday_data = market_index.fetch_with_fallback(
+            stock_code, lambda s: price_store.get_history(s, fetch_plan.plan("5m", VISIBLE_INTRADAY, SPANS), "5m"))
+        daily_data = resample.daily_from_intraday(symbol, intraday_data, fetch_plan.plan("1d", VISIBLE_DAILY, SPANS))
+        # 公司名稱查本地股票主檔，不再呼叫很慢的 ticker.info
+        name = symbol_master.get_name(stock_code)
         return daily_data, intraday_data, name
     except Exception as e:
         print(f"錯誤：{e}")
         return None, None, "未知公司"
 
 def calculate_third_rule(price):
-    base = round(price * 0.07 / 3)
+    base, levels = third_rule.third_rule_levels(price)
+    up_10, up_7, up_2_3, up_1_3, down_1_3, down_2_3, down_7, down_10 = levels.tolist()
     result = {
         "目前股價 💰        ": price,
-        "基礎數值（四捨五入）": base,
-        "⬆ 往上 10%        ": round(price + 3 * base + base, 1),
-        "⬆ 往上 7%         ": round(price + 2 * base + base, 1),
-        "⬆ 往上 2/3        ": round(price + 2 * base, 1),
-        "⬆ 往上 1/3        ": round(price + base, 1),
+        "基礎數值（四捨五入）": int(base),
+        "⬆ 往上 10%        ": up_10,
+        "⬆ 往上 7%         ": up_7,
+        "⬆ 往上 2/3        ": up_2_3,
+        "⬆ 往上 1/3        ": up_1_3,
         "────────────": "────────────",
-        "⬇ 往下 1/3        ": round(price - base, 1),
-        "⬇ 往下 2/3        ": round(price - 2 * base, 1),
-        "⬇ 往下 7%         ": round(price - 2 * base - base, 1),
-        "⬇ 往下 10%        ": round(price - 3 * base - base, 1)
+        "⬇ 往下 1/3        ": down_1_3,
+        "⬇ 往下 2/3        ": down_2_3,
+        "⬇ 往下 7%         ": down_7,
+        "⬇ 往下 10%        ": down_10
     }
     return result
 
 def add_ema(data, spans):
-    for span in spans:
-        data[f"EMA{span}"] = data["Close"].ewm(span=span).mean()
+    emas = indicators.ema_matrix(data["Close"].to_numpy(dtype=float), spans)
+    data[[f"EMA{span}" for span in spans]] = emas
     return data
 
-def detect_crossovers(data):
+def detect_crossovers(data, fast="EMA6", slow="EMA30"):
+    golden, death = indicators.cross_masks(data[fast], data[slow])
     alerts = []
-    for i in range(1, len(data)):
-        if data["EMA6"].iloc[i-1] < data["EMA30"].iloc[i-1] and data["EMA6"].iloc[i] > data["EMA30"].iloc[i]:
-            alerts.append((data.index[i], data["Close"].iloc[i], "金叉：EMA6 上穿 EMA30"))
-        elif data["EMA6"].iloc[i-1] > data["EMA30"].iloc[i-1] and data["EMA6"].iloc[i] < data["EMA30"].iloc[i]:
-            alerts.append((data.index[i], data["Close"].iloc[i], "死叉：EMA6 下穿 EMA30"))
+    for i in np.flatnonzero(golden | death):
+        label = f"金叉：{fast} 上穿 {slow}" if golden[i] else f"死叉：{fast} 下穿 {slow}"
+        alerts.append((data.index[i], data["Close"].iloc[i], label))
     return alerts
 
 def calculate_recent_average(data):
@@ -69,50 +83,59 @@ def calculate_recent_average(data):
         results.append((date_str, avg))
     return results  # [(日期, 均價), ...]
 
+# EMA 用完整的暖機資料計算，畫圖只取最後幾根
+def prepare_charts(daily_data, intraday_data):
+    return (add_ema(daily_data, SPANS).iloc[-VISIBLE_DAILY:],
+            add_ema(intraday_data, SPANS).iloc[-VISIBLE_INTRADAY:])
+
+# daily_data、intraday_data 為 prepare_charts 的結果；必須在主執行緒呼叫
 def plot_trend_with_ema(daily_data, intraday_data):
     if daily_data is None or intraday_data is None:
         messagebox.showerror("錯誤", "找不到股票資料")
         return
 
-    spans = [6, 12, 30, 60, 90, 180]
+    spans = SPANS
     colors = ["orange", "cyan", "purple", "limegreen", "pink", "blue"]
     labels = ["EMA6", "EMA12", "EMA30", "EMA60", "EMA90", "EMA180"]
 
-    daily_data = add_ema(daily_data, spans)
-    intraday_data = add_ema(intraday_data, spans)
-
     alerts = detect_crossovers(daily_data)
     avg_list = calculate_recent_average(daily_data)
 
-    apds_daily = [mpf.make_addplot(daily_data[f"EMA{span}"], color=colors[i], panel=0, label=labels[i]) for i, span in enumerate(spans)]
-    apds_intra = [mpf.make_addplot(intraday_data[f"EMA{span}"], color=colors[i], panel=0, label=labels[i]) for i, span in enumerate(spans)]
+    # K棒多到超過圖寬時自動合併，EMA 線以 LTTB 取樣；x_daily、x_intra 為每根原始K棒在圖上的位置
+    lines_daily = {labels[i]: (daily_data[f"EMA{span}"], colors[i]) for i, span in enumerate(spans)}
+    lines_intra = {labels[i]: (intraday_data[f"EMA{span}"], colors[i]) for i, span in enumerate(spans)}
+
+    for fig in _figures:
+        plt.close(fig)
+    _figures.clear()
 
     mc = mpf.make_marketcolors(up='red', down='green', inherit=True)
     s = mpf.make_mpf_style(marketcolors=mc, base_mpf_style='yahoo')
 
-    fig_daily, axes_daily = mpf.plot(
+    fig_daily, axes_daily, x_daily = downsample.plot(
         daily_data,
+        lines_daily,
         type='candle',
         style=s,
         title='日K + EMA',
-        addplot=apds_daily,
         volume=True,
         figscale=1.2,
         figratio=(6,4),
         panel_ratios=(6,2),
         ylabel='價格',
         ylabel_lower='成交量',
-        returnfig=True,
         datetime_format='%Y-%m-%d'
     )
+    _figures.append(fig_daily)
     axes_daily[0].legend(loc='upper left')
 
     for i, span in enumerate(spans):
         value = round(daily_data[f"EMA{span}"].iloc[-1], 2)
-        axes_daily[0].text(daily_data.index[-1], daily_data[f"EMA{span}"].iloc[-1], f"{labels[i]}: {value}", fontsize=8, color=colors[i], ha='left')
+        axes_daily[0].text(x_daily[-1], daily_data[f"EMA{span}"].iloc[-1], f"{labels[i]}: {value}", fontsize=8, color=colors[i], ha='left')
 
     for alert in alerts[-3:]:
-        axes_daily[0].annotate(alert[2], xy=(alert[0], alert[1]), xytext=(alert[0], alert[1] * 1.03),
+        x = x_daily[daily_data.index.get_loc(alert[0])]
+        axes_daily[0].annotate(alert[2], xy=(x, alert[1]), xytext=(x, alert[1] * 1.03),
                                textcoords="data", ha="center", fontsize=9,
                                bbox=dict(boxstyle="round,pad=0.2", facecolor='white', edgecolor='red'),
                                arrowprops=dict(facecolor='red', arrowstyle="->"))
@@ -121,44 +144,80 @@ def plot_trend_with_ema(daily_data, intraday_data):
     axes_daily[0].text(0.02, 0.92, f"📊 三日均價：{avg_str}",
                       transform=axes_daily[0].transAxes, fontsize=10, verticalalignment='top')
 
-    fig_intra, axes_intra = mpf.plot(
+    fig_intra, axes_intra, x_intra = downsample.plot(
         intraday_data,
+        lines_intra,
         type='candle',
         style=s,
         title='5分K + EMA',
-        addplot=apds_intra,
         volume=True,
         figscale=1.2,
         figratio=(6,4),
         panel_ratios=(6,2),
         ylabel='價格',
         ylabel_lower='成交量',
-        returnfig=True,
         datetime_format='%Y-%m-%d %H:%M'
     )
+    _figures.append(fig_intra)
     axes_intra[0].legend(loc='upper left')
 
     for i, span in enumerate(spans):
         value = round(intraday_data[f"EMA{span}"].iloc[-1], 2)
-        axes_intra[0].text(intraday_data.index[-1], intraday_data[f"EMA{span}"].iloc[-1], f"{labels[i]}: {value}", fontsize=8, color=colors[i], ha='left')
+        axes_intra[0].text(x_intra[-1], intraday_data[f"EMA{span}"].iloc[-1], f"{labels[i]}: {value}", fontsize=8, color=colors[i], ha='left')
+
+    plt.show(block=False)
 
-    plt.show()
+# 在背景執行緒執行：下載、三分之一法、三日均價與 EMA；畫圖留給主執行緒
+def load(stock_id):
+    daily_data, intraday_data, name = get_stock_data(stock_id)
+    if daily_data is None or intraday_data is None:
+        return None
+    latest_price = round(daily_data['Close'].iloc[-1], 1)
+    result = calculate_third_rule(latest_price)
+    avg_list = calculate_recent_average(daily_data)
+    return (name, result, avg_list) + prepare_charts(daily_data, intraday_data)
 
+# 送出查詢後立刻返回，畫面保留上一次的結果直到新結果回來
 def analyze():
+    global _latest, _pending
     stock_id = entry.get()
     if not stock_id:
         messagebox.showwarning("輸入錯誤", "請輸入股票代碼")
         return
 
-    daily_data, intraday_data, name = get_stock_data(stock_id)
-    if daily_data is None:
-        messagebox.showerror("錯誤", "無法取得股價資料")
-        return
-
-    latest_price = round(daily_data['Close'][-1], 1)
-    result = calculate_third_rule(latest_price)
-    avg_list = calculate_recent_average(daily_data)
-
+    # 還沒開始的舊查詢直接取消；已在執行的無法中斷，回來時依序號丟掉
+    if _pending is not None:
+        _pending.cancel()
+    _latest += 1
+    generation = _latest
+    _pending = _executor.submit(load, stock_id)
+    _pending.add_done_callback(lambda future: _results.put((generation, stock_id, future)))
+    status.config(text=f"⏳ 載入 {stock_id} 中…")
+
+# 顯示或畫圖出錯時只影響這一次查詢，一定要重新排下一次輪詢，否則之後的查詢都不會再顯示
+def poll_results():
+    try:
+        while True:
+            generation, stock_id, future = _results.get_nowait()
+            if generation != _latest or future.cancelled():
+                continue
+            status.config(text="")
+            try:
+                if future.exception() is not None:
+                    raise future.exception()
+                if future.result() is None:
+                    messagebox.showerror("錯誤", "無法取得股價資料")
+                else:
+                    show_result(stock_id, *future.result())
+            except Exception as e:
+                print(f"錯誤：{e}")
+                messagebox.showerror("錯誤", f"無法顯示 {stock_id} 的分析結果：{e}")
+    except queue.Empty:
+        pass
+    finally:
+        window.after(POLL_MS, poll_results)
+
+def show_result(stock_id, name, result, avg_list, daily_data, intraday_data):
     output.config(state='normal')
     output.delete("1.0", tk.END)
     output.insert(tk.END, f"📊 計算結果：{stock_id} - {name}\n\n")
@@ -201,10 +260,15 @@ entry.pack(pady=5)
 button = ttk.Button(window, text="分析股價", command=analyze)
 button.pack(pady=10)
 
+status = tk.Label(window, text="", font=("Arial", 11), bg="#f5f5f5", fg="#666666")
+status.pack()
+
 output = tk.Text(window, height=25, width=50, font=("Courier New", 12), state='disabled', bg="#ffffff")
 output.tag_configure("up", background="#ffe6e6")
 output.tag_configure("down", background="#e6ffe6")
 output.tag_configure("price", background="#fff2cc", font=("Courier New", 12, "bold"))
 output.pack(pady=(10, 20))
 
+window.after(POLL_MS, poll_results)
 window.mainloop()
+_executor.shutdown(wait=False, cancel_futures=True)